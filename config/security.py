@@ -2,7 +2,7 @@
 
 import re
 import logging
-from typing import Tuple
+from typing import Iterable, Tuple
 
 # Docker security options
 DOCKER_SECURITY_OPTS = [
@@ -31,8 +31,29 @@ BLOCKED_PATTERNS = [
     r'http://|https://',  # URL schemes
 ]
 
+# All blocked patterns folded into one alternation (one named group per
+# pattern so the offending rule can still be reported)
+_BLOCKED_RE = re.compile(
+    "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(BLOCKED_PATTERNS)),
+    re.IGNORECASE,
+)
+
+# Every blocked pattern needs one of these characters or words, so input
+# containing none of them can skip the regex (keep in sync with the list)
+_SUSPICIOUS_CHARS = frozenset("$`&|;")
+_SUSPICIOUS_WORDS = ("curl", "wget", "eval", "exec", "import", "http")
+
 # Discord role requirements
-ALLOWED_ROLES = ["verified-member", "officers", "admin"]
+ALLOWED_ROLES = frozenset({"verified-member", "officers", "admin"})
+
+
+def _is_suspicious(user_input: str) -> bool:
+    """Cheap pre-filter: could any blocked pattern match this input?"""
+    # Non-ASCII letters can case-fold onto ASCII ones (e.g. U+0130), leave those to the regex
+    if not user_input.isascii() or not _SUSPICIOUS_CHARS.isdisjoint(user_input):
+        return True
+    lowered = user_input.lower()
+    return any(word in lowered for word in _SUSPICIOUS_WORDS)
 
 
 def sanitize_input(user_input: str) -> Tuple[bool, str]:
@@ -45,17 +66,25 @@ def sanitize_input(user_input: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, cleaned_input or error_message)
     """
+    cleaned = user_input.strip()
+
+    # Shortest blocked inputs ("$(", "&&", "||") are two characters
+    if len(cleaned) < 2:
+        return True, cleaned
+
     # Check for malicious patterns
-    for pattern in BLOCKED_PATTERNS:
-        if re.search(pattern, user_input, re.IGNORECASE):
-            logging.warning(f"BLOCKED_INPUT - Pattern: {pattern} - Input: {user_input[:50]}")
-            return False, "Invalid input detected"
+    match = _is_suspicious(user_input) and _BLOCKED_RE.search(user_input)
+    if match:
+        pattern = BLOCKED_PATTERNS[int(match.lastgroup[1:])]
+        logging.warning("BLOCKED_INPUT - Pattern: %s - Input: %.50s", pattern, user_input)
+        return False, "Invalid input detected"
 
-    # Clean and return
-    cleaned = user_input.strip()
     return True, cleaned
 
 
-def check_role(user_roles: list) -> bool:
-    """Check if user has required role"""
-    return any(role in ALLOWED_ROLES for role in user_roles)
+def check_role(member_roles: Iterable) -> bool:
+    """Check if user has required role
+
+    Accepts discord.Role objects (e.g. ctx.author.roles) or plain role names.
+    """
+    return any(getattr(role, "name", role) in ALLOWED_ROLES for role in member_roles)
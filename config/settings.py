@@ -25,6 +25,8 @@ RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', 10))
 # AI configuration (optional)
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 AI_MODEL = "deepseek/deepseek-chat"
+# Command parsing only emits a few JSON bytes, so it runs on a small model
+AI_PARSER_MODEL = os.getenv('OPENROUTER_PARSER_MODEL', 'meta-llama/llama-3.1-8b-instruct')
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
@@ -37,6 +39,9 @@ DATA_DIR.mkdir(exist_ok=True)
 LOG_DIR.mkdir(exist_ok=True)
 CHALLENGES_DIR.mkdir(exist_ok=True)
 
+# Stats snapshot format: "json" (readable) or "msgpack" (smaller and faster to load; needs msgpack)
+STATS_FORMAT = os.getenv('STATS_FORMAT', 'json').lower()
+
 # Logging
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = LOG_DIR / os.getenv('LOG_FILE', 'bagley.log')
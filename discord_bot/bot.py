@@ -1,15 +1,17 @@
 """Main Discord bot file"""
 
+import asyncio
 import logging
 import discord
+from cachetools import TTLCache
 from discord.ext import commands
-from config.settings import DISCORD_BOT_TOKEN, COMMAND_PREFIX, LOG_FILE, LOG_LEVEL
+from config.settings import DISCORD_BOT_TOKEN, COMMAND_PREFIX, LOG_FILE, LOG_LEVEL, AVAILABLE_LABS
 from config.security import check_role, sanitize_input
 from skills.lab_orchestrator import LabManager
 from skills.challenge_manager import ChallengeManager
 from skills.stats_manager import StatsManager
 from skills.ai_integration import AIOrchestrator
-from discord_bot.utils import rate_limiter
+from discord_bot.utils import rate_limiter, normalize_arg
 
 # Setup logging
 logging.basicConfig(
@@ -35,15 +37,73 @@ challenge_manager = ChallengeManager()
 stats_manager = StatsManager()
 ai_orchestrator = AIOrchestrator()
 
-# Track unverified user warnings
-warned_unverified = set()
+# Track unverified user warnings (bounded; users are re-warned after a day)
+warned_unverified = TTLCache(maxsize=10000, ttl=86400)
+
+# Lab types that can be started without AI parsing
+_KNOWN_LABS = frozenset(AVAILABLE_LABS)
+
+# Common typos/shorthands for argument-free commands, resolved locally
+# before falling back to AI parsing
+_ALIASES = {
+    "statu": "status",
+    "ls": "list",
+    "lst": "list",
+    "labs": "list",
+    "categorie": "categories",
+    "category": "categories",
+    "cats": "categories",
+    "lb": "leaderboard",
+    "top": "leaderboard",
+    "leaders": "leaderboard",
+    "commands": "help",
+}
+
+# Static responses, built once at startup
+_LAB_LIST_TEXT = lab_manager.list_available()
+_CATEGORIES_TEMPLATE = (
+    "📚 **Challenge Categories:**\n"
+    "{}"
+    "\n\nUse `!challenges <category>` to see challenges"
+)
+_HELP_TEXT = """
+🤖 **Bagley Bot Commands**
+
+**Lab Management:**
+`!start <lab>` - Start a CTF lab
+`!stop <lab>` - Stop a running lab
+`!delete <lab>` - Delete a lab
+`!status` - Check your active labs
+`!list` - List available labs
+
+**Challenges:**
+`!categories` - List challenge categories
+`!challenges <cat>` - List challenges in category
+`!solve <id> <flag>` - Submit a flag
+
+**Stats:**
+`!leaderboard` - Top players
+`!stats [user]` - User statistics
+
+**Available Labs:**
+- dvwa - Damn Vulnerable Web App
+- webgoat - OWASP WebGoat
+- juice-shop - OWASP Juice Shop
+- metasploitable - Metasploitable 2
+
+**Examples:**
+`!start dvwa`
+`!status`
+`!challenges cryptography`
+`!solve crypto-001 flag{answer}`
+    """
 
 
 @bot.event
 async def on_ready():
     """Bot startup event"""
-    logger.info(f'{bot.user} has connected to Discord!')
-    logger.info(f'Connected to {len(bot.guilds)} guild(s)')
+    logger.info('%s has connected to Discord!', bot.user)
+    logger.info('Connected to %d guild(s)', len(bot.guilds))
 
     # Set bot status
     await bot.change_presence(
@@ -61,17 +121,16 @@ async def start_lab(ctx, *, lab_input: str):
     username = ctx.author.name
 
     # Check role
-    user_roles = [role.name for role in ctx.author.roles]
-    if not check_role(user_roles):
+    if not check_role(ctx.author.roles):
         if ctx.author.id not in warned_unverified:
             await ctx.send(
                 "👋 Hey! You need to be verified to use labs.\n"
                 "Contact @officers to get the @verified-member role.\n"
                 "This helps us keep the server secure!"
             )
-            warned_unverified.add(ctx.author.id)
+            warned_unverified[ctx.author.id] = True
 
-        logger.info(f"UNVERIFIED_ACCESS - User: {username} - Command: start {lab_input}")
+        logger.info("UNVERIFIED_ACCESS - User: %s - Command: start %s", username, lab_input)
         return
 
     # Check rate limit
@@ -84,15 +143,16 @@ async def start_lab(ctx, *, lab_input: str):
     is_valid, cleaned_input = sanitize_input(lab_input)
     if not is_valid:
         await ctx.send(f"❌ {cleaned_input}")
-        logger.warning(f"BLOCKED_INPUT - User: {username} - Input: {lab_input}")
+        logger.warning("BLOCKED_INPUT - User: %s - Input: %s", username, lab_input)
         return
 
-    # Try direct parsing first (faster)
-    lab_type = cleaned_input.lower().strip()
+    # Try direct parsing first (faster); sanitize_input already stripped it
+    lab_type = cleaned_input.lower()
 
     # If not a direct match, try AI parsing
-    if lab_type not in ['dvwa', 'webgoat', 'juice-shop', 'metasploitable']:
-        result = ai_orchestrator.parse_command(cleaned_input)
+    if lab_type not in _KNOWN_LABS:
+        # Off the event loop: a slow or retried API call would stall every other command
+        result = await asyncio.to_thread(ai_orchestrator.parse_command, cleaned_input)
 
         if 'error' in result:
             await ctx.send(f"❌ {result['error']}")
@@ -129,8 +189,7 @@ async def stop_lab(ctx, lab_type: str):
     username = ctx.author.name
 
     # Check role
-    user_roles = [role.name for role in ctx.author.roles]
-    if not check_role(user_roles):
+    if not check_role(ctx.author.roles):
         return
 
     # Check rate limit
@@ -139,7 +198,7 @@ async def stop_lab(ctx, lab_type: str):
         await ctx.send(msg)
         return
 
-    result = lab_manager.stop_lab(username, lab_type.lower())
+    result = lab_manager.stop_lab(username, normalize_arg(lab_type))
     await ctx.send(result)
 
 
@@ -153,8 +212,7 @@ async def delete_lab(ctx, lab_type: str):
     username = ctx.author.name
 
     # Check role
-    user_roles = [role.name for role in ctx.author.roles]
-    if not check_role(user_roles):
+    if not check_role(ctx.author.roles):
         return
 
     # Check rate limit
@@ -163,7 +221,7 @@ async def delete_lab(ctx, lab_type: str):
         await ctx.send(msg)
         return
 
-    result = lab_manager.delete_lab(username, lab_type.lower())
+    result = lab_manager.delete_lab(username, normalize_arg(lab_type))
     await ctx.send(result)
 
 
@@ -176,8 +234,7 @@ async def status(ctx):
     username = ctx.author.name
 
     # Check role
-    user_roles = [role.name for role in ctx.author.roles]
-    if not check_role(user_roles):
+    if not check_role(ctx.author.roles):
         return
 
     result = lab_manager.get_status(username)
@@ -190,8 +247,7 @@ async def list_labs(ctx):
 
     Usage: !list
     """
-    result = lab_manager.list_available()
-    await ctx.send(result)
+    await ctx.send(_LAB_LIST_TEXT)
 
 
 @bot.command(name='categories')
@@ -206,11 +262,7 @@ async def categories(ctx):
         await ctx.send("❌ No challenges loaded yet.")
         return
 
-    msg = "📚 **Challenge Categories:**\n"
-    msg += ", ".join(cats)
-    msg += "\n\nUse `!challenges <category>` to see challenges"
-
-    await ctx.send(msg)
+    await ctx.send(_CATEGORIES_TEMPLATE.format(", ".join(cats)))
 
 
 @bot.command(name='challenges')
@@ -234,8 +286,7 @@ async def solve(ctx, challenge_id: str, *, flag: str):
     username = ctx.author.name
 
     # Check role
-    user_roles = [role.name for role in ctx.author.roles]
-    if not check_role(user_roles):
+    if not check_role(ctx.author.roles):
         return
 
     # Check rate limit
@@ -298,39 +349,7 @@ async def help_command(ctx):
 
     Usage: !help
     """
-    help_text = """
-🤖 **Bagley Bot Commands**
-
-**Lab Management:**
-`!start <lab>` - Start a CTF lab
-`!stop <lab>` - Stop a running lab
-`!delete <lab>` - Delete a lab
-`!status` - Check your active labs
-`!list` - List available labs
-
-**Challenges:**
-`!categories` - List challenge categories
-`!challenges <cat>` - List challenges in category
-`!solve <id> <flag>` - Submit a flag
-
-**Stats:**
-`!leaderboard` - Top players
-`!stats [user]` - User statistics
-
-**Available Labs:**
-- dvwa - Damn Vulnerable Web App
-- webgoat - OWASP WebGoat
-- juice-shop - OWASP Juice Shop
-- metasploitable - Metasploitable 2
-
-**Examples:**
-`!start dvwa`
-`!status`
-`!challenges cryptography`
-`!solve crypto-001 flag{answer}`
-    """
-
-    await ctx.send(help_text)
+    await ctx.send(_HELP_TEXT)
 
 
 # Error handler
@@ -338,9 +357,17 @@ async def help_command(ctx):
 async def on_command_error(ctx, error):
     """Handle command errors"""
     if isinstance(error, commands.CommandNotFound):
-        # Try AI parsing for natural language
         user_input = ctx.message.content[1:]  # Remove prefix
-        result = ai_orchestrator.parse_command(user_input)
+
+        # Known aliases first (no network round-trip)
+        words = user_input.split(maxsplit=1)
+        alias = _ALIASES.get(words[0].lower()) if words else None
+        if alias:
+            await ctx.invoke(bot.get_command(alias))
+            return
+
+        # Try AI parsing for natural language
+        result = await asyncio.to_thread(ai_orchestrator.parse_command, user_input)
 
         if 'error' not in result:
             # Redirect to appropriate command
@@ -361,7 +388,7 @@ async def on_command_error(ctx, error):
         await ctx.send(f"❌ Missing argument. Use `!help` for usage.")
 
     else:
-        logger.error(f"Command error: {error}")
+        logger.error("Command error: %s", error)
         await ctx.send("❌ An error occurred. Contact admin if this persists.")
 
 
@@ -1,9 +1,10 @@
 """Utility functions for Discord bot"""
 
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta
+import time
+from collections import deque
 from typing import Optional, Tuple
+from cachetools import TTLCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,8 +18,9 @@ class RateLimiter:
         self.warn_limit = warn_limit
         self.hard_limit = hard_limit
 
-        self.user_requests = defaultdict(list)
-        self.warned_users = set()
+        # Bounded so idle users age out instead of accumulating forever
+        self.user_requests = TTLCache(maxsize=10000, ttl=120)
+        self.warned_users = TTLCache(maxsize=10000, ttl=3600)
 
     def check_limit(self, username: str) -> Tuple[bool, Optional[str]]:
         """
@@ -27,45 +29,53 @@ class RateLimiter:
         Returns:
             (allowed, optional_warning_message)
         """
-        now = datetime.now()
-        cutoff = now - timedelta(minutes=1)
+        now = time.monotonic()
+        cutoff = now - 60.0
 
-        # Clean old requests
-        self.user_requests[username] = [
-            t for t in self.user_requests[username]
-            if t > cutoff
-        ]
+        requests = self.user_requests.get(username)
+        if requests is None:
+            requests = deque()
+        # Re-insert on every call so the entry's TTL runs from the latest request
+        self.user_requests[username] = requests
 
-        request_count = len(self.user_requests[username])
+        # Drop requests older than the window (oldest first)
+        while requests and requests[0] <= cutoff:
+            requests.popleft()
+
+        request_count = len(requests)
 
         # Soft limit - no warning
         if request_count < self.soft_limit:
-            self.user_requests[username].append(now)
+            requests.append(now)
             return True, None
 
         # Warn limit - show warning once
         elif request_count < self.warn_limit:
-            self.user_requests[username].append(now)
+            requests.append(now)
 
             if username not in self.warned_users:
-                self.warned_users.add(username)
+                self.warned_users[username] = True
                 return True, "⚠️ You're sending commands quickly. Please slow down."
 
             return True, None
 
         # Hard limit - block
         elif request_count < self.hard_limit:
-            self.user_requests[username].append(now)
+            requests.append(now)
             return True, None
 
         else:
-            logger.warning(f"RATE_LIMIT_EXCEEDED - User: {username} - Count: {request_count}")
+            logger.warning("RATE_LIMIT_EXCEEDED - User: %s - Count: %d", username, request_count)
             return False, "❌ Too many commands. Wait 1 minute."
 
     def reset_warnings(self, username: str):
         """Reset warnings for a user (called periodically)"""
-        if username in self.warned_users:
-            self.warned_users.remove(username)
+        self.warned_users.pop(username, None)
+
+
+def normalize_arg(value: str) -> str:
+    """Normalize a command argument (lab type, category) for lookups"""
+    return value.strip().lower()
 
 
 # Global rate limiter instance
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Serve the security, stats and challenge commands from one warm process.
+
+Listens on DAEMON_SOCKET for newline-delimited JSON requests such as
+{"module": "security", "action": "rate_limit", "args": ["alice"]} and
+answers each with {"output": <the script's stdout>, "exit": <exit code>}.
+While it runs, security.py, stats_manager.py and challenge_manager.py
+forward to it instead of reloading their state on every invocation.
+
+lab_orchestrator.py is not served here: its commands wait on Docker and
+would hold up every other request.
+
+Usage: python3 bagley_daemon.py   (runs until interrupted)
+"""
+
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+from contextlib import redirect_stdout
+from typing import List, Tuple
+
+import challenge_manager
+import logging_setup
+import security
+import stats_manager
+from config import DAEMON_IDLE_TIMEOUT, DAEMON_SOCKET
+
+MODULES = {
+    "security": security,
+    "stats_manager": stats_manager,
+    "challenge_manager": challenge_manager,
+}
+
+
+def _call(module: str, action: str, args: List[str]) -> Tuple[str, int]:
+    """Run a script's main() as if invoked from the CLI; return (stdout, exit code)."""
+    main = MODULES[module].main
+    out = io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = [f"{module}.py", action, *args]
+    code = 0
+    try:
+        with redirect_stdout(out):
+            main()
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    finally:
+        sys.argv = saved_argv
+    return out.getvalue(), code
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    timeout = DAEMON_IDLE_TIMEOUT  # applied to the connection by setup()
+
+    def handle(self) -> None:
+        try:
+            for line in self.rfile:
+                try:
+                    req = json.loads(line)
+                    output, code = _call(req["module"], req["action"], [str(a) for a in req.get("args", [])])
+                except (ValueError, KeyError, TypeError) as exc:
+                    output = json.dumps({"success": False, "error": f"Bad request: {exc}"}) + "\n"
+                    code = 1
+                self.wfile.write(json.dumps({"output": output, "exit": code}).encode() + b"\n")
+        except TimeoutError:
+            # Client connected but went quiet; drop it so the next one is served
+            pass
+
+
+def main() -> None:
+    logging_setup.configure()
+
+    # A leftover socket from a crashed run would make bind() fail
+    DAEMON_SOCKET.unlink(missing_ok=True)
+
+    # One request at a time: the modules' caches and the SQLite handle are not shared across threads
+    server = socketserver.UnixStreamServer(str(DAEMON_SOCKET), _Handler)
+    os.chmod(DAEMON_SOCKET, 0o600)
+    # Let supervisors stop us with SIGTERM and still remove the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        DAEMON_SOCKET.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,67 +4,148 @@
 All public functions are accessible via CLI and return JSON to stdout.
 """
 
+import hmac
 import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from config import CHALLENGES_DIR, DATA_DIR, LOGS_DIR
+import daemon_client
+import jsonio
+import logging_setup
+from config import CHALLENGES_DIR, DATA_DIR
 
 # ── Logging ─────────────────────────────────────────────────────
 
+# Handlers are attached by logging_setup.configure() in main()
 audit_logger = logging.getLogger("audit")
-audit_logger.setLevel(logging.INFO)
-_ah = logging.FileHandler(LOGS_DIR / "audit.log")
-_ah.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-audit_logger.addHandler(_ah)
-
 error_logger = logging.getLogger("errors")
-error_logger.setLevel(logging.ERROR)
-_eh = logging.FileHandler(LOGS_DIR / "errors.log")
-_eh.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-error_logger.addHandler(_eh)
+
 
 # ── Stats Helper (inline import avoidance) ──────────────────────
 
 STATS_FILE = DATA_DIR / "user_stats.json"
 
+# Parsed stats, reused while the file's mtime is unchanged
+_STATS: Optional[Dict] = None
+_STATS_MTIME: Optional[int] = None
+# username -> set of solved challenge ids, kept in step with _STATS
+_SOLVED: Dict[str, set] = {}
+
 
 def _load_stats() -> Dict:
-    if STATS_FILE.exists():
-        try:
-            return json.loads(STATS_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    global _STATS, _STATS_MTIME, _SOLVED
+    try:
+        mtime = STATS_FILE.stat().st_mtime_ns
+    except OSError:
+        _SOLVED = {}
+        return {}
+
+    if _STATS is not None and mtime == _STATS_MTIME:
+        return _STATS
+
+    try:
+        _STATS = jsonio.loads(STATS_FILE.read_bytes())
+    except (json.JSONDecodeError, OSError):
+        _SOLVED = {}
+        return {}
+    _STATS_MTIME = mtime
+    _SOLVED = {
+        user: {s["challenge_id"] for s in data.get("solves", [])}
+        for user, data in _STATS.items()
+    }
+    return _STATS
 
 
 def _save_stats(data: Dict) -> None:
-    STATS_FILE.write_text(json.dumps(data, indent=2))
+    """Write stats compactly and atomically (temp file + rename)."""
+    global _STATS, _STATS_MTIME, _SOLVED
+    try:
+        jsonio.atomic_write_json(STATS_FILE, data)
+    except Exception:
+        # The cached dict already holds the unsaved solve; reload from disk next time
+        _STATS = None
+        _SOLVED = {}
+        raise
+    _STATS = data
+    _STATS_MTIME = STATS_FILE.stat().st_mtime_ns
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat()
 
 
 # ── Challenge Loading ───────────────────────────────────────────
 
 
+_CACHE: Optional[Dict[str, dict]] = None
+_CACHE_SIG: Optional[tuple] = None
+_BY_CATEGORY: Dict[str, List[dict]] = {}
+
+
+def _tree_sig() -> tuple:
+    """Cheap fingerprint of the challenges/ tree: (path, mtime, size) per file."""
+    sig = []
+    for challenge_file in sorted(CHALLENGES_DIR.glob("*/*.json")):
+        try:
+            st = challenge_file.stat()
+        except OSError:
+            continue
+        sig.append((str(challenge_file), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
 def _load_all_challenges() -> Dict[str, dict]:
+    """Return all challenges, re-reading the tree only when it has changed."""
+    global _CACHE, _CACHE_SIG, _BY_CATEGORY
+
+    sig = _tree_sig()
+    if _CACHE is not None and sig == _CACHE_SIG:
+        return _CACHE
+
+    _CACHE = _read_challenges()
+    _CACHE_SIG = sig
+
+    # Category buckets, pre-sorted by points for list_challenges
+    by_category: Dict[str, List[dict]] = {}
+    for c in _CACHE.values():
+        cat_key = (c.get("category") or "uncategorized").lower()
+        by_category.setdefault(cat_key, []).append(c)
+    for bucket in by_category.values():
+        bucket.sort(key=lambda c: c.get("points", 0))
+    _BY_CATEGORY = by_category
+
+    return _CACHE
+
+
+def _read_challenge_file(challenge_file: Path) -> Optional[dict]:
+    try:
+        return jsonio.loads(challenge_file.read_bytes())
+    except (json.JSONDecodeError, OSError) as exc:
+        error_logger.error("Bad challenge file %s: %s", challenge_file, exc)
+        return None
+
+
+def _read_challenges() -> Dict[str, dict]:
     """Load every challenge JSON from the challenges/ tree."""
     challenges: Dict[str, dict] = {}
 
     if not CHALLENGES_DIR.exists():
         return challenges
 
-    for category_dir in CHALLENGES_DIR.iterdir():
-        if not category_dir.is_dir():
-            continue
-        for challenge_file in category_dir.glob("*.json"):
-            try:
-                data = json.loads(challenge_file.read_text())
-                cid = data.get("id")
-                if cid:
-                    challenges[cid] = data
-            except (json.JSONDecodeError, OSError) as exc:
-                error_logger.error(f"Bad challenge file {challenge_file}: {exc}")
+    files = list(CHALLENGES_DIR.glob("*/*.json"))
+    if not files:
+        return challenges
+
+    # Files are small and independent; overlap the reads, fold in order
+    with ThreadPoolExecutor(max_workers=min(8, len(files))) as pool:
+        for data in pool.map(_read_challenge_file, files):
+            cid = data.get("id") if data else None
+            if cid:
+                challenges[cid] = data
 
     return challenges
 
@@ -75,23 +156,18 @@ def _load_all_challenges() -> Dict[str, dict]:
 def list_categories() -> Dict[str, Any]:
     """Return all unique challenge categories."""
     challenges = _load_all_challenges()
-    cats = sorted({c.get("category", "uncategorized") for c in challenges.values()})
+    cats = sorted({c.get("category") or "uncategorized" for c in challenges.values()})
     return {"success": True, "categories": cats, "count": len(cats)}
 
 
 def list_challenges(category: str) -> Dict[str, Any]:
     """Return challenges in a specific category, sorted by points."""
-    challenges = _load_all_challenges()
-    filtered = [
-        c for c in challenges.values()
-        if c.get("category", "").lower() == category.lower()
-    ]
+    _load_all_challenges()
+    filtered = _BY_CATEGORY.get(category.lower(), [])
 
     if not filtered:
         return {"success": True, "challenges": [], "message": f"No challenges in category: {category}"}
 
-    filtered.sort(key=lambda c: c.get("points", 0))
-
     items = []
     for c in filtered:
         items.append({
@@ -138,15 +214,14 @@ def solve(username: str, challenge_id: str, flag: str) -> Dict[str, Any]:
 
     # Check for duplicate solve
     stats = _load_stats()
-    user = stats.get(username, {})
-    solved_ids = [s["challenge_id"] for s in user.get("solves", [])]
-    if challenge_id in solved_ids:
+    if challenge_id in _SOLVED.get(username, ()):
         return {"success": True, "correct": False, "message": "You've already solved this challenge."}
 
     # Validate flag
-    correct_flag = c.get("flag", "")
-    if flag.strip() != correct_flag:
-        audit_logger.info(f"FLAG_INCORRECT - User: {username} - Challenge: {challenge_id}")
+    # Constant-time so response timing can't be used to guess the flag
+    correct_flag = c.get("flag", "").strip()
+    if not correct_flag or not hmac.compare_digest(flag.strip().encode(), correct_flag.encode()):
+        audit_logger.info("FLAG_INCORRECT - User: %s - Challenge: %s", username, challenge_id)
         return {"success": True, "correct": False, "message": "Incorrect flag. Try again!"}
 
     # Award points
@@ -154,23 +229,23 @@ def solve(username: str, challenge_id: str, flag: str) -> Dict[str, Any]:
     category = c.get("category", "unknown")
 
     # Update stats inline (avoid circular imports with stats_manager)
-    from datetime import datetime
-
+    now_iso = _now_iso()
     if username not in stats:
         stats[username] = {
             "total_points": 0,
             "solves": [],
             "categories": {},
             "labs_started": 0,
-            "first_seen": datetime.now().isoformat(),
+            "first_seen": now_iso,
         }
 
+    _SOLVED.setdefault(username, set()).add(challenge_id)
     stats[username]["total_points"] += points
     stats[username]["solves"].append({
         "challenge_id": challenge_id,
         "points": points,
         "category": category,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso,
     })
 
     if category not in stats[username]["categories"]:
@@ -180,7 +255,7 @@ def solve(username: str, challenge_id: str, flag: str) -> Dict[str, Any]:
     _save_stats(stats)
 
     audit_logger.info(
-        f"FLAG_CORRECT - User: {username} - Challenge: {challenge_id} - Points: +{points}"
+        "FLAG_CORRECT - User: %s - Challenge: %s - Points: +%s", username, challenge_id, points
     )
 
     return {
@@ -196,10 +271,12 @@ def solve(username: str, challenge_id: str, flag: str) -> Dict[str, Any]:
 
 
 def _output(data: Dict[str, Any]) -> None:
-    print(json.dumps(data))
+    sys.stdout.write(jsonio.dumps(data).decode() + "\n")
 
 
 def main() -> None:
+    logging_setup.configure()
+
     if len(sys.argv) < 2:
         _output({"success": False, "error": "Usage: challenge_manager.py <action> [args...]"})
         sys.exit(1)
@@ -233,10 +310,11 @@ def main() -> None:
             sys.exit(1)
 
     except Exception as exc:
-        error_logger.error(f"challenge_manager.py {action} failed: {exc}", exc_info=True)
+        error_logger.error("challenge_manager.py %s failed: %s", action, exc, exc_info=True)
         _output({"success": False, "error": str(exc)})
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
+    if not daemon_client.forward("challenge_manager"):
+        main()
@@ -1,5 +1,6 @@
 """Configuration constants for CTF Labs skill"""
 
+import re
 from pathlib import Path
 
 # ── Resolved Paths ──────────────────────────────────────────────
@@ -37,9 +38,18 @@ RATE_LIMIT_WARN = 15
 RATE_LIMIT_HARD = 20
 RATE_LIMIT_BLOCK_SECONDS = 60
 
+# ── Command Daemon ──────────────────────────────────────────────
+
+# bagley_daemon.py listens here; the CLI scripts forward to it when present
+DAEMON_SOCKET = DATA_DIR / "bagley.sock"
+DAEMON_TIMEOUT = 30  # seconds to wait for a reply
+# Seconds the daemon waits on a connected client for its request line; it
+# serves one connection at a time, so a silent client must not hold it
+DAEMON_IDLE_TIMEOUT = 5
+
 # ── Access Control ──────────────────────────────────────────────
 
-ALLOWED_ROLES = ["Operator", "Officer"]
+ALLOWED_ROLES = frozenset({"Operator", "Officer"})
 HARDCODED_ADMIN_ID = 393483939194601472
 
 # ── Docker Security Options ─────────────────────────────────────
@@ -96,6 +106,12 @@ BLOCKED_PATTERNS = [
     r'/etc/passwd',       # Sensitive files
 ]
 
+# Single precompiled alternation of the above; group p<i> is BLOCKED_PATTERNS[i]
+BLOCKED_RE = re.compile(
+    "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(BLOCKED_PATTERNS)),
+    re.IGNORECASE,
+)
+
 # ── Available Lab Types ─────────────────────────────────────────
 
 AVAILABLE_LABS = {
@@ -0,0 +1,41 @@
+"""Forward a CLI invocation to bagley_daemon.py when it is running.
+
+The scripts call forward() from their __main__ block. If the daemon's socket
+is missing or refuses the connection, forward() returns False and the script
+runs the command itself as before.
+"""
+
+import json
+import socket
+import sys
+
+from config import DAEMON_SOCKET, DAEMON_TIMEOUT
+
+
+def forward(module: str) -> bool:
+    """Run sys.argv through the daemon, print its output and exit with its code."""
+    if len(sys.argv) < 2 or not DAEMON_SOCKET.exists():
+        return False
+
+    request = {"module": module, "action": sys.argv[1], "args": sys.argv[2:]}
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(DAEMON_TIMEOUT)
+    try:
+        sock.connect(str(DAEMON_SOCKET))
+    except OSError:
+        # Stale socket file or daemon not accepting; run locally
+        sock.close()
+        return False
+
+    # Past this point the daemon may already have acted, so never fall back
+    try:
+        with sock:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            reply = json.loads(sock.makefile("rb").readline())
+        output, code = reply["output"], reply["exit"]
+    except (OSError, ValueError, KeyError) as exc:
+        output = json.dumps({"success": False, "error": f"Daemon request failed: {exc}"}) + "\n"
+        code = 1
+
+    sys.stdout.write(output)
+    sys.exit(code)
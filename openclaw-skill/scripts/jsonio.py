@@ -0,0 +1,38 @@
+"""JSON helpers shared by the skill scripts.
+
+Uses orjson when it is installed and falls back to the stdlib json module.
+Decode errors are json.JSONDecodeError in both cases.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the skill itself only needs the stdlib
+    orjson = None
+
+
+def loads(raw: bytes) -> Any:
+    """Parse JSON from raw bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(data: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, compact unless indent is set."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2).encode()
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def atomic_write_json(path: Path, data: Any, indent: bool = False) -> None:
+    """Write JSON via a temp file + rename so readers never see a partial file."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(dumps(data, indent))
+    os.replace(tmp, path)
@@ -4,15 +4,22 @@
 All public functions are accessible via CLI and return JSON to stdout.
 """
 
+import fcntl
 import json
 import logging
+import os
+import secrets
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
+import jsonio
+import logging_setup
 from config import (
     AVAILABLE_LABS,
     AUTO_CLEANUP_HOURS,
@@ -24,7 +31,6 @@ from config import (
     DOCKER_SECURITY_OPTS,
     DOCKER_SUBNET,
     LAB_TMPFS,
-    LOGS_DIR,
     MAX_LABS_PER_USER,
     MAX_TOTAL_LABS,
     SCHOOL_NETWORK_BLOCK,
@@ -32,34 +38,83 @@ from config import (
 
 # ── Logging ─────────────────────────────────────────────────────
 
+# Handlers are attached by logging_setup.configure() in main()
 audit_logger = logging.getLogger("audit")
-audit_logger.setLevel(logging.INFO)
-_ah = logging.FileHandler(LOGS_DIR / "audit.log")
-_ah.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-audit_logger.addHandler(_ah)
-
 error_logger = logging.getLogger("errors")
-error_logger.setLevel(logging.ERROR)
-_eh = logging.FileHandler(LOGS_DIR / "errors.log")
-_eh.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-error_logger.addHandler(_eh)
 
 # ── Active Labs Persistence ─────────────────────────────────────
 
 ACTIVE_LABS_FILE = DATA_DIR / "active_labs.json"
+# flock'd around every load/modify/save of ACTIVE_LABS_FILE (this script and lab_state_daemon.py)
+ACTIVE_LABS_LOCK = DATA_DIR / "active_labs.lock"
+
+# Touched periodically by lab_state_daemon.py while it is watching docker events
+EVENTS_HEARTBEAT_FILE = DATA_DIR / "lab_events.heartbeat"
+EVENTS_FRESH_SECONDS = 30
+
+# Stamped once the isolated network exists (the skill never deletes it);
+# cleared again if a docker run fails
+NETWORK_READY_FILE = DATA_DIR / ".network_ready"
+_NETWORK_READY = False
+
+# Last `docker system df` result for server_stats
+SERVER_STATS_CACHE_FILE = DATA_DIR / "server_stats_cache.json"
+SERVER_STATS_CACHE_SECONDS = 60
+
+# Parsed active labs, reused while the file's mtime is unchanged
+_ACTIVE_LABS: Optional[Dict[str, Dict]] = None
+_ACTIVE_LABS_MTIME: Optional[int] = None
+# owner -> container names, rebuilt whenever labs are loaded from or saved to disk
+_BY_OWNER: Dict[str, List[str]] = {}
+
+
+def _index_by_owner(data: Dict[str, Dict]) -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = {}
+    for name, info in data.items():
+        index.setdefault(info["owner"], []).append(name)
+    return index
+
+
+def _owner_labs(username: str) -> List[str]:
+    """Names of a user's labs as of the last load/save (call before mutating labs)."""
+    return _BY_OWNER.get(username, [])
 
 
 def _load_active_labs() -> Dict[str, Dict]:
-    if ACTIVE_LABS_FILE.exists():
-        try:
-            return json.loads(ACTIVE_LABS_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    global _ACTIVE_LABS, _ACTIVE_LABS_MTIME, _BY_OWNER
+    try:
+        mtime = ACTIVE_LABS_FILE.stat().st_mtime_ns
+    except OSError:
+        _BY_OWNER = {}
+        return {}
+
+    if _ACTIVE_LABS is not None and mtime == _ACTIVE_LABS_MTIME:
+        return _ACTIVE_LABS
+
+    try:
+        _ACTIVE_LABS = jsonio.loads(ACTIVE_LABS_FILE.read_bytes())
+    except (json.JSONDecodeError, OSError):
+        _BY_OWNER = {}
+        return {}
+    _ACTIVE_LABS_MTIME = mtime
+    _BY_OWNER = _index_by_owner(_ACTIVE_LABS)
+    return _ACTIVE_LABS
+
+
+@contextmanager
+def _labs_locked() -> Iterator[None]:
+    """Hold the active labs lock; load inside it so the save can't undo another writer."""
+    with open(ACTIVE_LABS_LOCK, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
 
 
 def _save_active_labs(data: Dict[str, Dict]) -> None:
-    ACTIVE_LABS_FILE.write_text(json.dumps(data, indent=2))
+    global _ACTIVE_LABS, _ACTIVE_LABS_MTIME, _BY_OWNER
+    jsonio.atomic_write_json(ACTIVE_LABS_FILE, data, indent=True)
+    _ACTIVE_LABS = data
+    _ACTIVE_LABS_MTIME = ACTIVE_LABS_FILE.stat().st_mtime_ns
+    _BY_OWNER = _index_by_owner(data)
 
 
 # ── Docker Helpers ──────────────────────────────────────────────
@@ -72,8 +127,14 @@ def _run(cmd: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
 
 def _ensure_network() -> bool:
     """Create the isolated Docker network if it doesn't exist."""
+    global _NETWORK_READY
+    if _NETWORK_READY or NETWORK_READY_FILE.exists():
+        _NETWORK_READY = True
+        return True
+
     check = _run(["docker", "network", "inspect", DOCKER_NETWORK])
     if check.returncode == 0:
+        _mark_network_ready()
         return True
 
     result = _run([
@@ -93,9 +154,23 @@ def _ensure_network() -> bool:
         "-j", "DROP",
     ])
     audit_logger.info(f"Created Docker network {DOCKER_NETWORK} ({DOCKER_SUBNET})")
+    _mark_network_ready()
     return True
 
 
+def _mark_network_ready() -> None:
+    global _NETWORK_READY
+    _NETWORK_READY = True
+    NETWORK_READY_FILE.touch()
+
+
+def _forget_network() -> None:
+    """Make the next _ensure_network() check Docker again."""
+    global _NETWORK_READY
+    _NETWORK_READY = False
+    NETWORK_READY_FILE.unlink(missing_ok=True)
+
+
 def _container_ip(name: str) -> Optional[str]:
     """Retrieve a container's IP on the CTF network."""
     result = _run([
@@ -108,12 +183,65 @@ def _container_ip(name: str) -> Optional[str]:
     return None
 
 
-def _container_running(name: str) -> bool:
-    """Check if a container is actively running."""
-    result = _run([
-        "docker", "inspect", "-f", "{{.State.Running}}", name,
-    ], timeout=10)
-    return result.returncode == 0 and result.stdout.strip() == "true"
+def _containers_running(names: List[str]) -> Dict[str, Optional[bool]]:
+    """Check several containers with a single docker inspect call.
+
+    Containers docker reports as missing count as not running. A name is
+    None when its state is unknown because docker inspect itself failed;
+    never treat that as stopped.
+    """
+    running: Dict[str, Optional[bool]] = {name: None for name in names}
+    if not names:
+        return running
+
+    try:
+        result = _run([
+            "docker", "inspect", "--type", "container",
+            "-f", "{{.Name}} {{.State.Running}}", *names,
+        ], timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        error_logger.error(f"docker inspect failed: {exc}")
+        return running
+
+    for line in result.stdout.splitlines():
+        name, _, state = line.strip().partition(" ")
+        name = name.lstrip("/")
+        if name in running:
+            running[name] = state == "true"
+
+    # docker exits non-zero but still prints the ones it found
+    for line in result.stderr.splitlines():
+        _, found, name = line.partition("No such container:")
+        if found and name.strip() in running:
+            running[name.strip()] = False
+    return running
+
+
+def _events_fresh() -> bool:
+    """True while lab_state_daemon.py is running and has checked in recently."""
+    try:
+        age = time.time() - EVENTS_HEARTBEAT_FILE.stat().st_mtime
+    except OSError:
+        return False
+    return age < EVENTS_FRESH_SECONDS
+
+
+def _started_epoch(info: Dict) -> float:
+    """Lab start time as a Unix timestamp; older records only have started_at."""
+    epoch = info.get("started_epoch")
+    if epoch is None:
+        epoch = info["started_epoch"] = datetime.fromisoformat(info["started_at"]).timestamp()
+    return epoch
+
+
+def _remove_containers(names: List[str], timeout: int = 30) -> None:
+    """Kill and remove containers in one call (rm -f makes a prior stop redundant).
+
+    The docker CLI already removes the named containers concurrently, so one
+    batched call beats a thread pool of per-container calls.
+    """
+    if names:
+        _run(["docker", "rm", "-f", *names], timeout=timeout)
 
 
 # ── Public Commands ─────────────────────────────────────────────
@@ -126,109 +254,115 @@ def start_lab(username: str, lab_type: str) -> Dict[str, Any]:
         avail = ", ".join(AVAILABLE_LABS.keys())
         return {"success": False, "error": f"Unknown lab type: {lab_type}", "available": avail}
 
-    labs = _load_active_labs()
-
-    # Enforce per-user limit
-    user_labs = [l for l in labs.values() if l["owner"] == username and l["status"] == "running"]
-    if len(user_labs) >= MAX_LABS_PER_USER:
-        running = [l["lab_type"] for l in user_labs]
-        return {
-            "success": False,
-            "error": f"You already have {MAX_LABS_PER_USER} labs running.",
-            "running_labs": running,
+    # Held through docker run: the limit checks stay valid, and a die/destroy
+    # event for the new container is applied after it has been recorded
+    with _labs_locked():
+        labs = _load_active_labs()
+
+        # Enforce per-user limit
+        user_labs = [labs[n] for n in _owner_labs(username) if labs[n]["status"] == "running"]
+        if len(user_labs) >= MAX_LABS_PER_USER:
+            running = [l["lab_type"] for l in user_labs]
+            return {
+                "success": False,
+                "error": f"You already have {MAX_LABS_PER_USER} labs running.",
+                "running_labs": running,
+            }
+
+        # Enforce system-wide limit
+        total_running = sum(1 for l in labs.values() if l["status"] == "running")
+        if total_running >= MAX_TOTAL_LABS:
+            return {"success": False, "error": "Server lab capacity reached. Try again later."}
+
+        # Ensure network
+        if not _ensure_network():
+            return {"success": False, "error": "Failed to create Docker network. Contact admin."}
+
+        lab_cfg = AVAILABLE_LABS[lab_type]
+        started = time.time()
+        container_name = f"{lab_type}-{username}-{secrets.token_hex(2)}"
+
+        # Build docker run command
+        cmd = [
+            "docker", "run", "-d",
+            "--name", container_name,
+            "--network", DOCKER_NETWORK,
+            f"--memory={CONTAINER_MEMORY}",
+            f"--cpus={CONTAINER_CPUS}",
+            f"--pids-limit={CONTAINER_PID_LIMIT}",
+            f"--label=ctf-owner={username}",
+            f"--label=ctf-lab-type={lab_type}",
+            f"--label=ctf-managed=true",
+        ]
+        cmd.extend(DOCKER_SECURITY_OPTS)
+        # Add lab-specific tmpfs mounts for writable directories
+        cmd.extend(LAB_TMPFS.get(lab_type, ["--tmpfs", "/tmp:rw,noexec,nosuid"]))
+        cmd.append(lab_cfg["image"])
+
+        result = _run(cmd, timeout=30)
+
+        if result.returncode != 0:
+            # The network may have been removed behind our back; re-check next time
+            _forget_network()
+            error_logger.error(f"Docker start failed for {container_name}: {result.stderr}")
+            return {"success": False, "error": f"Failed to start {lab_type}. Check Docker logs."}
+
+        # Get IP
+        ip = _container_ip(container_name)
+        if not ip:
+            # Cleanup on failure
+            _run(["docker", "rm", "-f", container_name])
+            return {"success": False, "error": "Container started but no IP assigned."}
+
+        port = lab_cfg["port"]
+
+        # Persist
+        labs[container_name] = {
+            "owner": username,
+            "lab_type": lab_type,
+            "container_name": container_name,
+            "ip_address": ip,
+            "port": port,
+            "started_at": datetime.fromtimestamp(started).isoformat(),  # for display
+            "started_epoch": started,
+            "status": "running",
         }
+        _save_active_labs(labs)
 
-    # Enforce system-wide limit
-    total_running = sum(1 for l in labs.values() if l["status"] == "running")
-    if total_running >= MAX_TOTAL_LABS:
-        return {"success": False, "error": "Server lab capacity reached. Try again later."}
-
-    # Ensure network
-    if not _ensure_network():
-        return {"success": False, "error": "Failed to create Docker network. Contact admin."}
-
-    lab_cfg = AVAILABLE_LABS[lab_type]
-    timestamp = datetime.now().strftime("%s")[-4:]
-    container_name = f"{lab_type}-{username}-{timestamp}"
-
-    # Build docker run command
-    cmd = [
-        "docker", "run", "-d",
-        "--name", container_name,
-        "--network", DOCKER_NETWORK,
-        f"--memory={CONTAINER_MEMORY}",
-        f"--cpus={CONTAINER_CPUS}",
-        f"--pids-limit={CONTAINER_PID_LIMIT}",
-        f"--label=ctf-owner={username}",
-        f"--label=ctf-lab-type={lab_type}",
-        f"--label=ctf-managed=true",
-    ]
-    cmd.extend(DOCKER_SECURITY_OPTS)
-    # Add lab-specific tmpfs mounts for writable directories
-    cmd.extend(LAB_TMPFS.get(lab_type, ["--tmpfs", "/tmp:rw,noexec,nosuid"]))
-    cmd.append(lab_cfg["image"])
-
-    result = _run(cmd, timeout=30)
-
-    if result.returncode != 0:
-        error_logger.error(f"Docker start failed for {container_name}: {result.stderr}")
-        return {"success": False, "error": f"Failed to start {lab_type}. Check Docker logs."}
-
-    # Get IP
-    ip = _container_ip(container_name)
-    if not ip:
-        # Cleanup on failure
-        _run(["docker", "rm", "-f", container_name])
-        return {"success": False, "error": "Container started but no IP assigned."}
-
-    port = lab_cfg["port"]
-
-    # Persist
-    labs[container_name] = {
-        "owner": username,
-        "lab_type": lab_type,
-        "container_name": container_name,
-        "ip_address": ip,
-        "port": port,
-        "started_at": datetime.now().isoformat(),
-        "status": "running",
-    }
-    _save_active_labs(labs)
+        audit_logger.info(f"LAB_STARTED - User: {username} - Lab: {container_name} - IP: {ip}:{port}")
 
-    audit_logger.info(f"LAB_STARTED - User: {username} - Lab: {container_name} - IP: {ip}:{port}")
-
-    return {
-        "success": True,
-        "lab_name": container_name,
-        "ip_address": ip,
-        "port": port,
-        "url": f"http://{ip}:{port}",
-        "auto_cleanup_hours": AUTO_CLEANUP_HOURS,
-    }
+        return {
+            "success": True,
+            "lab_name": container_name,
+            "ip_address": ip,
+            "port": port,
+            "url": f"http://{ip}:{port}",
+            "auto_cleanup_hours": AUTO_CLEANUP_HOURS,
+        }
 
 
 def stop_lab(username: str, lab_type: str) -> Dict[str, Any]:
     """Stop and remove a user's lab of the given type."""
 
-    labs = _load_active_labs()
+    with _labs_locked():
+        labs = _load_active_labs()
 
-    # Find matching lab
-    target = None
-    for name, info in labs.items():
-        if info["owner"] == username and info["lab_type"] == lab_type and info["status"] == "running":
-            target = name
-            break
+        # Find matching lab among the user's own
+        target = None
+        for name in _owner_labs(username):
+            info = labs[name]
+            if info["lab_type"] == lab_type and info["status"] == "running":
+                target = name
+                break
 
-    if not target:
-        return {"success": False, "error": f"You don't have a running {lab_type} lab."}
+        if not target:
+            return {"success": False, "error": f"You don't have a running {lab_type} lab."}
 
-    # Stop & remove
-    _run(["docker", "stop", target], timeout=30)
-    _run(["docker", "rm", "-f", target], timeout=15)
+        # Kill & remove
+        _remove_containers([target])
 
-    labs[target]["status"] = "stopped"
-    del labs[target]
-    _save_active_labs(labs)
+        del labs[target]
+        _save_active_labs(labs)
 
     audit_logger.info(f"LAB_STOPPED - User: {username} - Lab: {target}")
     return {"success": True, "message": f"Stopped {target}"}
@@ -240,20 +374,25 @@ def status_labs(username: str) -> Dict[str, Any]:
     labs = _load_active_labs()
     user_labs = []
 
-    for name, info in labs.items():
-        if info["owner"] != username:
-            continue
-
-        # Verify container is actually running
-        running = _container_running(name)
-        if not running and info["status"] == "running":
-            info["status"] = "stopped"
-
+    names = _owner_labs(username)
+    if _events_fresh():
+        # lab_state_daemon.py keeps statuses current; trust the stored ones
+        live = {name: labs[name]["status"] == "running" for name in names}
+    else:
+        # Verify containers are actually running (one docker call for all)
+        live = _containers_running(names)
+
+    now = time.time()
+    stopped = []
+    for name in names:
+        info = labs[name]
         if info["status"] != "running":
             continue
+        if live[name] is False:
+            stopped.append(name)
+            continue
 
-        started = datetime.fromisoformat(info["started_at"])
-        uptime_h = (datetime.now() - started).total_seconds() / 3600
+        uptime_h = (now - _started_epoch(info)) / 3600
         remaining_h = max(0, AUTO_CLEANUP_HOURS - uptime_h)
 
         user_labs.append({
@@ -265,7 +404,14 @@ def status_labs(username: str) -> Dict[str, Any]:
             "remaining_hours": round(remaining_h, 1),
         })
 
-    _save_active_labs(labs)
+    # A plain status query leaves the file alone
+    if stopped:
+        with _labs_locked():
+            labs = _load_active_labs()  # may have changed since the read above
+            for name in stopped:
+                if name in labs:
+                    labs[name]["status"] = "stopped"
+            _save_active_labs(labs)
     return {"success": True, "active_labs": user_labs}
 
 
@@ -287,17 +433,15 @@ def list_labs() -> Dict[str, Any]:
 def force_cleanup(username: str) -> Dict[str, Any]:
     """Immediately stop and remove all of a user's labs (officer command)."""
 
-    labs = _load_active_labs()
-    removed = []
+    with _labs_locked():
+        labs = _load_active_labs()
+        removed = list(_owner_labs(username))
 
-    for name in list(labs.keys()):
-        if labs[name]["owner"] == username:
-            _run(["docker", "stop", name], timeout=15)
-            _run(["docker", "rm", "-f", name], timeout=15)
-            removed.append(name)
+        for name in removed:
             del labs[name]
 
-    _save_active_labs(labs)
+        _remove_containers(removed)
+        _save_active_labs(labs)
     audit_logger.info(f"FORCE_CLEANUP - Target: {username} - Removed: {removed}")
     return {"success": True, "removed": removed, "count": len(removed)}
 
@@ -305,33 +449,79 @@ def force_cleanup(username: str) -> Dict[str, Any]:
 def auto_cleanup() -> Dict[str, Any]:
     """Remove labs that have exceeded AUTO_CLEANUP_HOURS."""
 
-    labs = _load_active_labs()
-    cleaned = []
+    with _labs_locked():
+        labs = _load_active_labs()
+
+        # Phase 1: classify every lab in one pass (one docker call for the live check)
+        now = time.time()
+        expired: Dict[str, float] = {}
+        for name, info in labs.items():
+            if info["status"] == "running":
+                uptime_h = (now - _started_epoch(info)) / 3600
+                if uptime_h > AUTO_CLEANUP_HOURS:
+                    expired[name] = uptime_h
+
+        live = _containers_running([name for name in labs if name not in expired])
+        # Only labs docker confirmed as stopped or gone; None means the check failed
+        orphaned = [name for name, running in live.items() if running is False]
+
+        if not expired and not orphaned:
+            return {"success": True, "cleaned": [], "count": 0}
+
+        # Phase 2: one docker call removes expired labs and leftover stopped containers
+        _remove_containers([*expired, *orphaned], timeout=60)
+
+        # Phase 3: drop the entries and save once
+        cleaned = []
+        for name, uptime_h in expired.items():
+            owner = labs.pop(name)["owner"]
+            cleaned.append({"name": name, "owner": owner, "uptime_hours": round(uptime_h, 1)})
+            audit_logger.info("AUTO_CLEANUP - Lab: %s - Owner: %s - Uptime: %.1fh", name, owner, uptime_h)
+        for name in orphaned:
+            del labs[name]
 
-    for name in list(labs.keys()):
-        info = labs[name]
-        if info["status"] != "running":
-            continue
+        _save_active_labs(labs)
+        return {"success": True, "cleaned": cleaned, "count": len(cleaned)}
 
-        started = datetime.fromisoformat(info["started_at"])
-        uptime_h = (datetime.now() - started).total_seconds() / 3600
 
-        if uptime_h > AUTO_CLEANUP_HOURS:
-            _run(["docker", "stop", name], timeout=15)
-            _run(["docker", "rm", "-f", name], timeout=15)
-            cleaned.append({"name": name, "owner": info["owner"], "uptime_hours": round(uptime_h, 1)})
-            del labs[name]
-            audit_logger.info(
-                f"AUTO_CLEANUP - Lab: {name} - Owner: {info['owner']} - Uptime: {uptime_h:.1f}h"
-            )
+def _command_output(cmd: List[str], timeout: int) -> Optional[str]:
+    """Stdout of an optional external command, or None if it failed or is missing."""
+    try:
+        result = _run(cmd, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
 
-    # Also remove any entries for containers no longer running
-    for name in list(labs.keys()):
-        if not _container_running(name):
-            del labs[name]
 
-    _save_active_labs(labs)
-    return {"success": True, "cleaned": cleaned, "count": len(cleaned)}
+def _docker_disk_usage() -> str:
+    """`docker system df` sizes, cached for SERVER_STATS_CACHE_SECONDS (it walks every layer)."""
+    try:
+        cached = jsonio.loads(SERVER_STATS_CACHE_FILE.read_bytes())
+        if time.time() - cached["checked_at"] < SERVER_STATS_CACHE_SECONDS:
+            return cached["docker_disk"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    disk = _command_output(["docker", "system", "df", "--format", "{{.Size}}"], timeout=10)
+    if disk is None:
+        return "unknown"
+    jsonio.atomic_write_json(SERVER_STATS_CACHE_FILE, {"docker_disk": disk, "checked_at": time.time()})
+    return disk
+
+
+def _memory_summary() -> str:
+    """Used/total/available memory from /proc/meminfo, in GiB."""
+    try:
+        with open("/proc/meminfo") as fh:
+            fields = {k: int(v.split()[0]) for k, v in (line.split(":", 1) for line in fh)}
+        total, available = fields["MemTotal"], fields["MemAvailable"]
+    except (OSError, ValueError, KeyError):
+        return "unknown"
+    gib = 1024 ** 2  # meminfo's "kB" are KiB
+    return (
+        f"{(total - available) / gib:.1f}G used / {total / gib:.1f}G total "
+        f"({available / gib:.1f}G available)"
+    )
 
 
 def server_stats() -> Dict[str, Any]:
@@ -340,27 +530,31 @@ def server_stats() -> Dict[str, Any]:
     labs = _load_active_labs()
     running = sum(1 for l in labs.values() if l["status"] == "running")
 
-    # Docker system info
-    disk = _run(["docker", "system", "df", "--format", "{{.Size}}"], timeout=10)
-    disk_usage = disk.stdout.strip() if disk.returncode == 0 else "unknown"
-
-    # Basic system stats
-    mem = _run(["free", "-h", "--si"], timeout=5)
-    cpu = _run(["nproc"], timeout=5)
-
-    # GPU (optional)
-    gpu = _run(["nvidia-smi", "--query-gpu=utilization.gpu,memory.used,memory.total",
-                "--format=csv,noheader,nounits"], timeout=5)
-    gpu_info = gpu.stdout.strip() if gpu.returncode == 0 else "N/A"
+    # The two external commands run side by side
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        disk = pool.submit(_docker_disk_usage)
+        gpu = pool.submit(
+            _command_output,
+            ["nvidia-smi", "--query-gpu=utilization.gpu,memory.used,memory.total",
+             "--format=csv,noheader,nounits"],
+            5,
+        )
+
+        # CPU count honours affinity like nproc did
+        try:
+            cpu_cores = str(len(os.sched_getaffinity(0)))
+        except AttributeError:
+            cpu_cores = str(os.cpu_count() or "unknown")
+        memory = _memory_summary()
 
     return {
         "success": True,
         "active_containers": running,
         "max_containers": MAX_TOTAL_LABS,
-        "docker_disk": disk_usage,
-        "cpu_cores": cpu.stdout.strip() if cpu.returncode == 0 else "unknown",
-        "memory": mem.stdout.strip() if mem.returncode == 0 else "unknown",
-        "gpu": gpu_info,
+        "docker_disk": disk.result(),
+        "cpu_cores": cpu_cores,
+        "memory": memory,
+        "gpu": gpu.result() or "N/A",
     }
 
 
@@ -368,10 +562,12 @@ def server_stats() -> Dict[str, Any]:
 
 
 def _output(data: Dict[str, Any]) -> None:
-    print(json.dumps(data))
+    sys.stdout.write(jsonio.dumps(data).decode() + "\n")
 
 
 def main() -> None:
+    logging_setup.configure()
+
     if len(sys.argv) < 2:
         _output({"success": False, "error": "Usage: lab_orchestrator.py <action> [args...]"})
         sys.exit(1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Keep active_labs.json in step with Docker container events.
+
+Watches `docker events` for skill-managed containers and records labs as
+stopped (or drops them) as soon as Docker reports it. While this runs it
+touches a heartbeat file, and `lab_orchestrator.py status` trusts the stored
+statuses instead of running docker inspect itself.
+
+Usage: python3 lab_state_daemon.py   (runs until docker events exits)
+"""
+
+import json
+import subprocess
+import sys
+import threading
+
+import logging_setup
+from lab_orchestrator import (
+    EVENTS_HEARTBEAT_FILE,
+    _containers_running,
+    _labs_locked,
+    _load_active_labs,
+    _save_active_labs,
+    audit_logger,
+    error_logger,
+)
+
+HEARTBEAT_SECONDS = 10
+
+EVENTS_CMD = [
+    "docker", "events",
+    "--filter", "type=container",
+    "--filter", "label=ctf-managed=true",
+    "--filter", "event=die",
+    "--filter", "event=destroy",
+    "--format", "{{json .}}",
+]
+
+
+# ── State Updates ───────────────────────────────────────────────
+
+
+def _reconcile() -> None:
+    """Catch up on anything that changed before the watcher started."""
+    with _labs_locked():
+        labs = _load_active_labs()
+        live = _containers_running([n for n, i in labs.items() if i["status"] == "running"])
+        stopped = [name for name, running in live.items() if running is False]
+        if not stopped:
+            return
+        for name in stopped:
+            labs[name]["status"] = "stopped"
+        _save_active_labs(labs)
+    audit_logger.info("LAB_EVENT - Reconciled stopped labs: %s", stopped)
+
+
+def _apply_event(event: dict) -> None:
+    """Record a die/destroy event against the matching lab, if we track it."""
+    action = event.get("Action") or event.get("status")
+    name = event.get("Actor", {}).get("Attributes", {}).get("name")
+
+    with _labs_locked():
+        labs = _load_active_labs()
+        info = labs.get(name)
+        if info is None:
+            return
+
+        if action == "destroy":
+            del labs[name]
+        elif action == "die" and info["status"] == "running":
+            info["status"] = "stopped"
+        else:
+            return
+
+        _save_active_labs(labs)
+    audit_logger.info("LAB_EVENT - Lab: %s - Owner: %s - Event: %s", name, info["owner"], action)
+
+
+def _heartbeat(stop: threading.Event) -> None:
+    while True:
+        EVENTS_HEARTBEAT_FILE.touch()
+        if stop.wait(HEARTBEAT_SECONDS):
+            return
+
+
+# ── Main Loop ───────────────────────────────────────────────────
+
+
+def main() -> None:
+    logging_setup.configure()
+
+    # Subscribe before reconciling so nothing slips between the two
+    proc = subprocess.Popen(EVENTS_CMD, stdout=subprocess.PIPE, text=True)
+    _reconcile()
+
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(stop,), daemon=True)
+    beat.start()
+
+    try:
+        for line in proc.stdout:
+            try:
+                _apply_event(json.loads(line))
+            except (json.JSONDecodeError, KeyError) as exc:
+                error_logger.error("lab_state_daemon.py bad event %r: %s", line[:200], exc)
+    except KeyboardInterrupt:
+        return
+    finally:
+        stop.set()
+        beat.join()
+        # Without a heartbeat, status falls back to live docker inspect
+        EVENTS_HEARTBEAT_FILE.unlink(missing_ok=True)
+        proc.terminate()
+
+    # docker events exited on its own; let the supervisor restart us
+    error_logger.error("lab_state_daemon.py: docker events exited (%s)", proc.wait())
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Audit/error logger setup shared by the skill scripts.
+
+Every script logs to the same "audit" and "errors" loggers. The scripts
+call configure() from main(), so importing one as a library sets up nothing.
+Handlers are attached once per process, however many of the scripts run in
+it. Log files are opened on the first record.
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from config import LOGS_DIR
+
+_FORMATTER = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+
+def get_audit_logger() -> logging.Logger:
+    """Return the "audit" logger, writing to audit.log from a background thread."""
+    logger = logging.getLogger("audit")
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(logging.INFO)
+    file_handler = logging.FileHandler(LOGS_DIR / "audit.log", delay=True)
+    file_handler.setFormatter(_FORMATTER)
+
+    # Callers only enqueue; the listener thread does the file writes
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, file_handler)
+    listener.start()
+    atexit.register(listener.stop)  # drains the queue before exit
+    logger.addHandler(QueueHandler(records))
+    return logger
+
+
+def get_error_logger() -> logging.Logger:
+    """Return the "errors" logger, writing to errors.log."""
+    logger = logging.getLogger("errors")
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(logging.ERROR)
+    handler = logging.FileHandler(LOGS_DIR / "errors.log", delay=True)
+    handler.setFormatter(_FORMATTER)
+    logger.addHandler(handler)
+    return logger
+
+
+def configure() -> None:
+    """Attach the audit and error handlers (called from each script's main())."""
+    get_audit_logger()
+    get_error_logger()
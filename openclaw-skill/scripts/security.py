@@ -1,21 +1,26 @@
 #!/usr/bin/env python3
 """Security module: access control, input sanitization, rate limiting, audit logging."""
 
+import bisect
 import json
 import logging
-import re
+import sqlite3
 import sys
 import time
+from array import array
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+import daemon_client
+import jsonio
+import logging_setup
 from config import (
     ALLOWED_ROLES,
     BLOCKED_PATTERNS,
+    BLOCKED_RE,
     DATA_DIR,
     HARDCODED_ADMIN_ID,
-    LOGS_DIR,
     RATE_LIMIT_BLOCK_SECONDS,
     RATE_LIMIT_HARD,
     RATE_LIMIT_SOFT,
@@ -24,39 +29,57 @@ from config import (
 
 # ── Logging Setup ───────────────────────────────────────────────
 
+# Handlers are attached by logging_setup.configure() in main()
 audit_logger = logging.getLogger("audit")
-audit_logger.setLevel(logging.INFO)
-_audit_handler = logging.FileHandler(LOGS_DIR / "audit.log")
-_audit_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-audit_logger.addHandler(_audit_handler)
-
 error_logger = logging.getLogger("errors")
-error_logger.setLevel(logging.ERROR)
-_error_handler = logging.FileHandler(LOGS_DIR / "errors.log")
-_error_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-error_logger.addHandler(_error_handler)
 
 # ── File Helpers ────────────────────────────────────────────────
 
-RATE_LIMITS_FILE = DATA_DIR / "rate_limits.json"
+RATE_LIMITS_DB = DATA_DIR / "rate_limits.sqlite"
 VERIFIED_USERS_FILE = DATA_DIR / "verified_users.json"
 
 
+# path -> (mtime_ns, parsed data), reused while the file is unchanged
+_JSON_CACHE: Dict[Path, Tuple[int, Dict]] = {}
+
+
 def _load_json(path: Path) -> Dict:
-    if path.exists():
-        try:
-            return json.loads(path.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+
+    cached = _JSON_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        data = jsonio.loads(path.read_bytes())
+    except (json.JSONDecodeError, OSError):
+        return {}
+    _JSON_CACHE[path] = (mtime, data)
+    return data
 
 
 def _save_json(path: Path, data: Dict) -> None:
-    path.write_text(json.dumps(data, indent=2))
+    try:
+        jsonio.atomic_write_json(path, data, indent=True)
+    except Exception:
+        # Callers change the cached dict in place; forget it so the unsaved change is too
+        _JSON_CACHE.pop(path, None)
+        raise
+    _JSON_CACHE[path] = (path.stat().st_mtime_ns, data)
+
+
+# Opened lazily by _rate_db() and kept for the life of the process
+_RATE_DB: Optional[sqlite3.Connection] = None
 
 
 # ── Access Control ──────────────────────────────────────────────
 
+# Discord sends IDs as canonical digit strings, so compare as strings
+_ADMIN_ID = str(HARDCODED_ADMIN_ID)
+
 
 def check_access(username: str, user_id: str, roles_csv: str) -> Dict[str, Any]:
     """
@@ -67,20 +90,15 @@ def check_access(username: str, user_id: str, roles_csv: str) -> Dict[str, Any]:
         user_id: Discord user ID (numeric string)
         roles_csv: Comma-separated list of Discord role names
     """
-    try:
-        uid = int(user_id)
-    except (ValueError, TypeError):
-        uid = 0
-
     # Hardcoded admin bypass – Discord guarantees this ID
-    if uid == HARDCODED_ADMIN_ID:
+    if user_id == _ADMIN_ID:
         audit_logger.info(f"ACCESS_GRANTED (admin) - User: {username} ID: {user_id}")
         return {"allowed": True, "admin": True}
 
     # Check Discord roles
-    roles: List[str] = [r.strip() for r in roles_csv.split(",") if r.strip()] if roles_csv else []
+    roles: List[str] = [r for r in map(str.strip, roles_csv.split(",")) if r] if roles_csv else []
 
-    if any(role in ALLOWED_ROLES for role in roles):
+    if not ALLOWED_ROLES.isdisjoint(roles):
         audit_logger.info(f"ACCESS_GRANTED - User: {username} Roles: {roles}")
         return {"allowed": True}
 
@@ -116,74 +134,102 @@ def sanitize(user_input: str) -> Dict[str, Any]:
     Args:
         user_input: Raw string from user
     """
-    if not user_input or not user_input.strip():
+    cleaned = user_input.strip() if user_input else ""
+    if not cleaned:
         return {"valid": False, "reason": "Empty input"}
 
-    for pattern in BLOCKED_PATTERNS:
-        if re.search(pattern, user_input, re.IGNORECASE):
-            audit_logger.warning(
-                f"BLOCKED_INPUT - Pattern: {pattern} - Input: {user_input[:80]}"
-            )
-            return {"valid": False, "reason": "Invalid input detected", "pattern": pattern}
+    # Single pass over the precompiled alternation from config
+    match = BLOCKED_RE.search(cleaned)
+    if match:
+        pattern = BLOCKED_PATTERNS[int(match.lastgroup[1:])]
+        audit_logger.warning("BLOCKED_INPUT - Pattern: %s - Input: %.80s", pattern, user_input)
+        return {"valid": False, "reason": "Invalid input detected", "pattern": pattern}
 
-    cleaned = user_input.strip()
     return {"valid": True, "cleaned": cleaned}
 
 
 # ── Rate Limiting ───────────────────────────────────────────────
 
 
+def _rate_db() -> sqlite3.Connection:
+    """Open (once per process) the rate-limit database."""
+    global _RATE_DB
+    if _RATE_DB is None:
+        conn = sqlite3.connect(RATE_LIMITS_DB, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rl ("
+            "user TEXT PRIMARY KEY, blocked_until REAL, warned INTEGER NOT NULL, ts BLOB NOT NULL)"
+        )
+        _RATE_DB = conn
+    return _RATE_DB
+
+
 def rate_limit(username: str) -> Dict[str, Any]:
     """
     Track and enforce per-user rate limits.
 
-    Uses file-based timestamp tracking since each CLI invocation is a
-    separate process.
+    Each CLI invocation is a separate process, so state lives in SQLite:
+    one row per user, read and rewritten inside a single write transaction.
     """
+    conn = _rate_db()
+    # Take the write lock up front so concurrent invocations serialize
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = _rate_limit_locked(conn, username)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return result
+
+
+def _rate_limit_locked(conn: sqlite3.Connection, username: str) -> Dict[str, Any]:
     now = time.time()
     cutoff = now - 60.0  # 1-minute window
 
-    data = _load_json(RATE_LIMITS_FILE)
-
-    # Per-user entry: {"timestamps": [...], "blocked_until": <epoch|null>, "warned": bool}
-    entry = data.get(username, {"timestamps": [], "blocked_until": None, "warned": False})
+    # Row: blocked_until <epoch|NULL>, warned 0/1, ts packed array('d')
+    # ts is ascending and never longer than RATE_LIMIT_HARD
+    row = conn.execute("SELECT blocked_until, warned, ts FROM rl WHERE user = ?", (username,)).fetchone()
+    blocked_until, warned, packed = row if row else (None, 0, b"")
 
     # Check active block
-    blocked_until = entry.get("blocked_until")
     if blocked_until and now < blocked_until:
         remaining = int(blocked_until - now)
         audit_logger.warning(f"RATE_LIMIT_BLOCKED - User: {username} - Wait: {remaining}s")
         return {"allowed": False, "wait_seconds": remaining}
 
-    # Clean stale timestamps
-    timestamps = [t for t in entry.get("timestamps", []) if t > cutoff]
+    # Drop stale timestamps in place; the array is sorted, so bisect finds the cutoff
+    timestamps = array("d", packed)
+    del timestamps[:bisect.bisect_right(timestamps, cutoff)]
     count = len(timestamps)
 
     # Hard limit – block for 60 seconds
     if count >= RATE_LIMIT_HARD:
-        entry["blocked_until"] = now + RATE_LIMIT_BLOCK_SECONDS
-        entry["timestamps"] = timestamps
-        entry["warned"] = False
-        data[username] = entry
-        _save_json(RATE_LIMITS_FILE, data)
+        conn.execute(
+            "INSERT OR REPLACE INTO rl VALUES (?, ?, 0, ?)",
+            (username, now + RATE_LIMIT_BLOCK_SECONDS, timestamps.tobytes()),
+        )
         audit_logger.warning(f"RATE_LIMIT_EXCEEDED - User: {username} - Count: {count}")
         return {"allowed": False, "wait_seconds": RATE_LIMIT_BLOCK_SECONDS}
 
-    # Record this request
+    # Record this request; anything past RATE_LIMIT_HARD would block anyway
     timestamps.append(now)
-    entry["timestamps"] = timestamps
-    entry["blocked_until"] = None
+    del timestamps[:-RATE_LIMIT_HARD]
 
     # Warning threshold
     warning = None
-    if count >= RATE_LIMIT_WARN and not entry.get("warned"):
+    if count >= RATE_LIMIT_WARN and not warned:
         warning = "⚠️ You're sending commands quickly. Please slow down."
-        entry["warned"] = True
+        warned = 1
     elif count < RATE_LIMIT_SOFT:
-        entry["warned"] = False
+        warned = 0
 
-    data[username] = entry
-    _save_json(RATE_LIMITS_FILE, data)
+    conn.execute(
+        "INSERT OR REPLACE INTO rl VALUES (?, NULL, ?, ?)",
+        (username, warned, timestamps.tobytes()),
+    )
 
     result: Dict[str, Any] = {"allowed": True}
     if warning:
@@ -224,10 +270,12 @@ def log_security_event(event_type: str, username: str, details: str) -> Dict[str
 
 
 def _output(data: Dict[str, Any]) -> None:
-    print(json.dumps(data))
+    sys.stdout.write(jsonio.dumps(data).decode() + "\n")
 
 
 def main() -> None:
+    logging_setup.configure()
+
     if len(sys.argv) < 2:
         _output({"success": False, "error": "Usage: security.py <action> [args...]"})
         sys.exit(1)
@@ -276,4 +324,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    if not daemon_client.forward("security"):
+        main()
@@ -4,6 +4,7 @@
 All public functions are accessible via CLI and return JSON to stdout.
 """
 
+import heapq
 import json
 import logging
 import sys
@@ -11,38 +12,63 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-from config import DATA_DIR, LOGS_DIR
+import daemon_client
+import jsonio
+import logging_setup
+from config import DATA_DIR
 
 # ── Logging ─────────────────────────────────────────────────────
 
+# Handlers are attached by logging_setup.configure() in main()
 audit_logger = logging.getLogger("audit")
-audit_logger.setLevel(logging.INFO)
-_ah = logging.FileHandler(LOGS_DIR / "audit.log")
-_ah.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-audit_logger.addHandler(_ah)
-
 error_logger = logging.getLogger("errors")
-error_logger.setLevel(logging.ERROR)
-_eh = logging.FileHandler(LOGS_DIR / "errors.log")
-_eh.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-error_logger.addHandler(_eh)
 
 # ── Persistence ─────────────────────────────────────────────────
 
 STATS_FILE = DATA_DIR / "user_stats.json"
 
+# Parsed stats, reused while the file's mtime is unchanged
+_STATS: Optional[Dict] = None
+_STATS_MTIME: Optional[int] = None
+# username -> set of solved challenge ids, kept in step with _STATS
+_SOLVED: Dict[str, set] = {}
+
 
 def _load_stats() -> Dict:
-    if STATS_FILE.exists():
-        try:
-            return json.loads(STATS_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    global _STATS, _STATS_MTIME, _SOLVED
+    try:
+        mtime = STATS_FILE.stat().st_mtime_ns
+    except OSError:
+        _SOLVED = {}
+        return {}
+
+    if _STATS is not None and mtime == _STATS_MTIME:
+        return _STATS
+
+    try:
+        _STATS = jsonio.loads(STATS_FILE.read_bytes())
+    except (json.JSONDecodeError, OSError):
+        _SOLVED = {}
+        return {}
+    _STATS_MTIME = mtime
+    _SOLVED = {
+        user: {s["challenge_id"] for s in data.get("solves", [])}
+        for user, data in _STATS.items()
+    }
+    return _STATS
 
 
 def _save_stats(data: Dict) -> None:
-    STATS_FILE.write_text(json.dumps(data, indent=2))
+    global _STATS, _STATS_MTIME, _SOLVED
+    try:
+        jsonio.atomic_write_json(STATS_FILE, data)
+    except Exception:
+        # Callers change the cached dict first; drop it so the unsaved change is forgotten
+        _STATS = None
+        _SOLVED = {}
+        raise
+    _STATS = data
+    _STATS_MTIME = STATS_FILE.stat().st_mtime_ns
 
 
 def _ensure_user(stats: Dict, username: str) -> Dict:
@@ -65,9 +91,8 @@ def leaderboard(limit: int = 10) -> Dict[str, Any]:
     """Return top players sorted by total points."""
     stats = _load_stats()
 
-    # Sort by total points descending
-    ranked = sorted(stats.items(), key=lambda x: x[1].get("total_points", 0), reverse=True)
-    ranked = ranked[:limit]
+    # Top `limit` by total points, without sorting every user
+    ranked = heapq.nlargest(limit, stats.items(), key=lambda x: x[1].get("total_points", 0))
 
     board = []
     for rank, (username, data) in enumerate(ranked, 1):
@@ -114,10 +139,10 @@ def record_solve(username: str, challenge_id: str, points: int, category: str) -
     user = _ensure_user(stats, username)
 
     # Duplicate check
-    solved_ids = [s["challenge_id"] for s in user.get("solves", [])]
-    if challenge_id in solved_ids:
+    if challenge_id in _SOLVED.get(username, ()):
         return {"success": False, "error": "Already solved"}
 
+    _SOLVED.setdefault(username, set()).add(challenge_id)
     user["total_points"] += points
     user["solves"].append({
         "challenge_id": challenge_id,
@@ -147,10 +172,12 @@ def record_lab_start(username: str) -> Dict[str, Any]:
 
 
 def _output(data: Dict[str, Any]) -> None:
-    print(json.dumps(data))
+    sys.stdout.write(jsonio.dumps(data).decode() + "\n")
 
 
 def main() -> None:
+    logging_setup.configure()
+
     if len(sys.argv) < 2:
         _output({"success": False, "error": "Usage: stats_manager.py <action> [args...]"})
         sys.exit(1)
@@ -191,4 +218,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    if not daemon_client.forward("stats_manager"):
+        main()
@@ -5,12 +5,19 @@ Core orchestration, challenge management, stats, and AI integration
 
 from .lab_orchestrator import LabEnvironment, LabManager
 from .challenge_manager import ChallengeManager
-from .stats_manager import StatsManager
-from .ai_integration import AIOrchestrator
+from .stats_manager import StatsManager, UserStats
 
 __all__ = [
     "LabEnvironment", "LabManager",
     "ChallengeManager",
-    "StatsManager",
+    "StatsManager", "UserStats",
     "AIOrchestrator",
 ]
+
+
+def __getattr__(name):
+    # AIOrchestrator pulls in requests; only import it when someone asks for it
+    if name == "AIOrchestrator":
+        from .ai_integration import AIOrchestrator
+        return AIOrchestrator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,58 @@
 """OpenRouter API integration for natural language parsing"""
 
 import os
+import re
 import json
+import asyncio
 import logging
+import threading
 import requests
-from typing import Dict, Optional
-from config.settings import OPENROUTER_API_KEY, AI_MODEL
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
+from urllib3.util.retry import Retry
+from config.settings import OPENROUTER_API_KEY, AI_MODEL, AI_PARSER_MODEL, AVAILABLE_LABS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Parsed results for these actions depend only on the input text, so they are safe to reuse
+CACHEABLE_ACTIONS = frozenset({"start", "stop", "delete", "status", "list", "help"})
+
+# Local parser for plain commands ("start dvwa", "stop juice shop", "list")
+_ACTION_RE = re.compile(r"\b(start|stop|delete|status|list|help)\b", re.IGNORECASE)
+_LAB_RE = re.compile(
+    r"\b(" + "|".join(lab.replace("-", "[- ]?") for lab in AVAILABLE_LABS) + r")\b",
+    re.IGNORECASE,
+)
+_LAB_NAMES = {lab.replace("-", ""): lab for lab in AVAILABLE_LABS}
+_NEGATION_RE = re.compile(r"\b(not|don'?t|no)\b|n't\b", re.IGNORECASE)
+_NO_LAB_ACTIONS = frozenset({"status", "list", "help"})
+
+# Collapses spacing/punctuation variants ("Start  DVWA!") onto one cache key
+_KEY_NOISE_RE = re.compile(r"[\s.,!?]+")
+
+# Upper bound on inputs per parse_commands_batch call
+MAX_BATCH_SIZE = 100
+
+
+def _parse_locally(user_input: str) -> Optional[Dict]:
+    """Parse unambiguous commands without the API; None means ask the model."""
+    if _NEGATION_RE.search(user_input):
+        return None
+    actions = {m.lower() for m in _ACTION_RE.findall(user_input)}
+    labs = {_LAB_NAMES[re.sub(r"[- ]", "", m.lower())] for m in _LAB_RE.findall(user_input)}
+    if len(actions) != 1 or len(labs) > 1:
+        return None
+
+    action = actions.pop()
+    if labs:
+        return {"action": action, "lab_type": labs.pop(), "success": True}
+    if action in _NO_LAB_ACTIONS:
+        return {"action": action, "success": True}
+    return None
+
 
 class AIOrchestrator:
     """Natural language command parsing via OpenRouter"""
@@ -18,6 +61,29 @@ class AIOrchestrator:
         self.api_key = api_key or OPENROUTER_API_KEY
         self.endpoint = "https://openrouter.ai/api/v1/chat/completions"
         self.model = AI_MODEL
+        self.parser_model = AI_PARSER_MODEL
+
+        # One pooled keep-alive session so each command skips the TCP/TLS handshake
+        self._session = requests.Session()
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+        retry = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),  # completions have no side effects
+            # A 429 can ask for a minute's wait; fail fast rather than stall the caller
+            respect_retry_after_header=False,
+        )
+        self._session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+
+        # (model, normalized input) -> parsed command; repeat commands skip the API.
+        # Normalization is lowercase with runs of spaces/punctuation folded.
+        self._cache = TTLCache(maxsize=512, ttl=3600)
+        self._cache_lock = threading.Lock()  # batch parsing calls in from worker threads
+        self.stats = {"hits": 0, "misses": 0}
 
         self.system_prompt = """You are a CTF lab assistant. Parse user commands and return JSON.
 
@@ -40,56 +106,104 @@ Examples:
 
 Only return valid JSON. No explanations."""
 
+    @staticmethod
+    def _clean_json(content: str) -> str:
+        """Strip a markdown code fence (```json ... ```) around the reply, if any"""
+        content = content.strip()
+        if content.startswith('```'):
+            content = content[3:]
+            if content[:4].lower() == 'json':
+                content = content[4:]
+        if content.endswith('```'):
+            content = content[:-3]
+        return content.strip()
+
     def parse_command(self, user_input: str) -> Dict:
         """Parse natural language command"""
 
+        local = _parse_locally(user_input)
+        if local is not None:
+            return local
+
         if not self.api_key:
             logger.warning("No OpenRouter API key configured")
             return {"error": "AI parsing not available"}
 
+        key = (self.parser_model, _KEY_NOISE_RE.sub(" ", user_input.lower()).strip())
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                return dict(cached)
+            self.stats["misses"] += 1
+
+        ok, content = self._chat(
+            [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_input}
+            ],
+            model=self.parser_model,
+            temperature=0,
+            max_tokens=50,
+            response_format="json_object",
+        )
+        if not ok:
+            return {"error": content}
+
         try:
-            response = requests.post(
-                self.endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": user_input}
-                    ],
-                },
-                timeout=30
-            )
+            # JSON mode should make this a no-op; kept for providers that ignore it
+            result = json.loads(self._clean_json(content))
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parse error: {e} - Content: {content}")
+            return {"error": "Invalid response from AI"}
+
+        if isinstance(result, dict) and result.get("success") and result.get("action") in CACHEABLE_ACTIONS:
+            with self._cache_lock:
+                self._cache[key] = dict(result)
+        return result
+
+    def _chat(
+        self,
+        messages: List[Dict],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 200,
+        response_format: Optional[str] = None,
+    ) -> Tuple[bool, str]:
+        """Send one chat completion; returns (True, reply text) or (False, user-facing error)"""
+
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if response_format:
+            payload["response_format"] = {"type": response_format}
 
+        try:
+            response = self._session.post(self.endpoint, json=payload, timeout=(5, 30))  # (connect, read)
             response.raise_for_status()
             data = response.json()
-
-            # Extract response
-            content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-
-            # Clean markdown code blocks if present
-            content = content.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            content = content.strip()
-
-            # Parse JSON
-            result = json.loads(content)
-            return result
+            return True, data.get('choices', [{}])[0].get('message', {}).get('content') or ''
 
         except requests.RequestException as e:
             logger.error(f"API request failed: {e}")
-            return {"error": "AI service unavailable"}
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {e} - Content: {content}")
-            return {"error": "Invalid response from AI"}
+            return False, "AI service unavailable"
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
-            return {"error": "Internal error"}
+            return False, "Internal error"
+
+    async def parse_commands_batch(self, inputs: List[str], concurrency: int = 16) -> List[Dict]:
+        """Parse several commands concurrently; results are in input order"""
+
+        if len(inputs) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} inputs per batch")
+
+        # Each parse runs on its own worker thread over the shared pooled session
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(inputs)))) as pool:
+            return list(await asyncio.gather(
+                *(loop.run_in_executor(pool, self.parse_command, text) for text in inputs)
+            ))
@@ -1,82 +1,197 @@
 """Challenge management system"""
 
+import os
+import hmac
 import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional
-from config.settings import CHALLENGES_DIR
+from config.settings import CHALLENGES_DIR, DATA_DIR
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DIFFICULTY_EMOJI = {
+    'easy': '🟢',
+    'medium': '🟡',
+    'hard': '🔴'
+}
+
+try:
+    from orjson import loads as _json_loads  # its decode error subclasses json.JSONDecodeError
+except ImportError:  # optional speedup
+    from json import loads as _json_loads
+
+try:
+    import ijson  # optional: stream large challenge files instead of decoding them whole
+except ImportError:
+    ijson = None
+
+# Challenge files above this size keep only SUMMARY_FIELDS in memory;
+# get_challenge re-reads the full record from disk when one is asked for
+LARGE_CHALLENGE_BYTES = 64 * 1024
+SUMMARY_FIELDS = frozenset({'id', 'title', 'category', 'difficulty', 'points', 'flag', 'hints'})
+
 
 class ChallengeManager:
     """Manages CTF challenges"""
 
     def __init__(self):
         self.challenges_dir = CHALLENGES_DIR
+        # All challenges in one file, rebuilt whenever a source file changes
+        self.pack_file = DATA_DIR / "challenges.pack.json"
         self.challenges: Dict[str, dict] = {}
+        # Built once after loading: lowercased category -> challenges sorted by points
+        self._by_category: Dict[str, List[dict]] = {}
+        self._categories: List[str] = []
+        # Rendered format_challenge_list output per lowercased category
+        self._format_cache: Dict[str, str] = {}
+        # challenge id -> stripped, encoded flag for constant-time comparison
+        self._flags: Dict[str, bytes] = {}
+        # challenge id -> source file, for large challenges held as summaries
+        self._large_sources: Dict[str, str] = {}
         self._load_all_challenges()
 
     def _load_all_challenges(self):
         """Load all challenge files from challenges directory"""
 
         if not self.challenges_dir.exists():
-            logger.warning(f"Challenges directory not found: {self.challenges_dir}")
+            logger.warning("Challenges directory not found: %s", self.challenges_dir)
             return
 
-        # Iterate through category directories
-        for category_dir in self.challenges_dir.iterdir():
-            if not category_dir.is_dir():
-                continue
-
-            # Load all JSON files in category
-            for challenge_file in category_dir.glob("*.json"):
-                try:
-                    with open(challenge_file, 'r') as f:
-                        challenge = json.load(f)
-                        challenge_id = challenge.get('id')
-
-                        if not challenge_id:
-                            logger.warning(f"Challenge missing ID: {challenge_file}")
-                            continue
-
-                        self.challenges[challenge_id] = challenge
-                        logger.info(f"Loaded challenge: {challenge_id}")
+        # scandir reuses the d_type from readdir, so no extra stat per entry
+        with os.scandir(self.challenges_dir) as categories:
+            category_dirs = [entry.path for entry in categories if entry.is_dir()]
+
+        # (path, size, mtime_ns) per source file; the pack is reused while this matches
+        sources = []
+        for category_dir in category_dirs:
+            with os.scandir(category_dir) as entries:
+                for e in entries:
+                    if e.name.endswith('.json') and e.is_file():
+                        st = e.stat()
+                        sources.append([e.path, st.st_size, st.st_mtime_ns])
+        sources.sort()
+
+        if not self._load_pack(sources):
+            for challenge_file, size, _ in sources:
+                self._load_challenge_file(challenge_file, size)
+            self._write_pack(sources)
+
+        self._build_category_index()
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Loaded %d challenges across %d categories", len(self.challenges), len(self.list_categories()))
+
+    def _load_challenge_file(self, challenge_file: str, size: int):
+        try:
+            large = size > LARGE_CHALLENGE_BYTES
+            challenge = self._read_summary(challenge_file) if large else self._read_challenge(challenge_file)
+            challenge_id = challenge.get('id')
+
+            if not challenge_id:
+                logger.warning("Challenge missing ID: %s", challenge_file)
+                return
+
+            self.challenges[challenge_id] = challenge
+            if large:
+                self._large_sources[challenge_id] = challenge_file
+            logger.debug("Loaded challenge: %s", challenge_id)
+
+        except json.JSONDecodeError as e:
+            logger.error("Invalid JSON in %s: %s", challenge_file, e)
+        except Exception as e:
+            logger.error("Error loading %s: %s", challenge_file, e)
+
+    def _load_pack(self, sources: List[list]) -> bool:
+        """Load every challenge from the pack file if it was built from these sources"""
+        try:
+            with open(self.pack_file, 'rb') as f:
+                pack = _json_loads(f.read())
+        except (OSError, ValueError):
+            return False
 
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON in {challenge_file}: {e}")
-                except Exception as e:
-                    logger.error(f"Error loading {challenge_file}: {e}")
+        if not isinstance(pack, dict) or pack.get('sources') != sources:
+            return False
 
-        logger.info(f"Loaded {len(self.challenges)} challenges across {len(self.list_categories())} categories")
+        self.challenges = pack['challenges']
+        self._large_sources = pack['large_sources']
+        return True
+
+    def _write_pack(self, sources: List[list]):
+        """Save the loaded challenges as one file so the next start reads and parses once"""
+        pack = {
+            'sources': sources,
+            'challenges': self.challenges,
+            'large_sources': self._large_sources,
+        }
+        tmp = self.pack_file.with_suffix(f'.{os.getpid()}.tmp')  # concurrent loaders don't share a temp file
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(pack, f, separators=(',', ':'))
+            os.replace(tmp, self.pack_file)
+        except OSError as e:
+            logger.warning("Could not write challenge pack %s: %s", self.pack_file, e)
+
+    @staticmethod
+    def _read_challenge(path: str) -> dict:
+        with open(path, 'rb') as f:
+            return _json_loads(f.read())
+
+    @staticmethod
+    def _read_summary(path: str) -> dict:
+        """Read only SUMMARY_FIELDS from a large challenge file"""
+        if ijson is None:
+            challenge = ChallengeManager._read_challenge(path)
+            return {k: v for k, v in challenge.items() if k in SUMMARY_FIELDS}
+        with open(path, 'rb') as f:
+            # use_float keeps numbers as int/float rather than Decimal
+            return {k: v for k, v in ijson.kvitems(f, '', use_float=True) if k in SUMMARY_FIELDS}
+
+    def _build_category_index(self):
+        """Index challenges by category so lookups don't rescan every challenge"""
+        by_category: Dict[str, List[dict]] = {}
+        for c in self.challenges.values():
+            by_category.setdefault(c.get('category', '').lower(), []).append(c)
+        for bucket in by_category.values():
+            bucket.sort(key=lambda c: c.get('points', 0))
+
+        self._by_category = by_category
+        self._flags = {
+            cid: c['flag'].strip().encode()
+            for cid, c in self.challenges.items() if c.get('flag')
+        }
+        self._format_cache.clear()
+        self._categories = sorted({c.get('category', 'uncategorized') for c in self.challenges.values()})
 
     def list_categories(self) -> List[str]:
         """Get list of all challenge categories"""
-        categories = set(c.get('category', 'uncategorized') for c in self.challenges.values())
-        return sorted(list(categories))
+        return list(self._categories)
 
     def get_challenges_by_category(self, category: str) -> List[dict]:
-        """Get all challenges in a specific category"""
-        return [
-            c for c in self.challenges.values()
-            if c.get('category', '').lower() == category.lower()
-        ]
+        """Get all challenges in a specific category, sorted by points"""
+        return list(self._by_category.get(category.lower(), ()))
 
     def get_challenge(self, challenge_id: str) -> Optional[dict]:
         """Get a specific challenge by ID"""
+        source = self._large_sources.get(challenge_id)
+        if source is not None:
+            try:
+                return self._read_challenge(source)
+            except (OSError, ValueError) as e:
+                logger.error("Error reloading %s: %s", source, e)
         return self.challenges.get(challenge_id)
 
     def check_flag(self, challenge_id: str, submitted_flag: str) -> bool:
         """Verify if submitted flag is correct"""
-        challenge = self.get_challenge(challenge_id)
+        correct_flag = self._flags.get(challenge_id)
 
-        if not challenge:
-            logger.warning(f"Challenge not found: {challenge_id}")
+        if correct_flag is None:
+            logger.warning("Challenge not found or has no flag: %s", challenge_id)
             return False
 
-        correct_flag = challenge.get('flag', '')
-        return submitted_flag.strip() == correct_flag
+        # Constant-time so response timing can't be used to guess the flag
+        return hmac.compare_digest(submitted_flag.strip().encode(), correct_flag)
 
     def get_hint(self, challenge_id: str, hint_number: int = 0) -> Optional[str]:
         """Get a hint for a challenge"""
@@ -94,28 +209,24 @@ class ChallengeManager:
 
     def format_challenge_list(self, category: str) -> str:
         """Format challenges for Discord display"""
-        challenges = self.get_challenges_by_category(category)
+        key = category.lower()
+        cached = self._format_cache.get(key)
+        if cached is not None:
+            return cached
 
+        challenges = self._by_category.get(key)
         if not challenges:
             return f"❌ No challenges found in category: {category}"
 
-        # Sort by points
-        challenges.sort(key=lambda c: c.get('points', 0))
-
-        msg = f"🔐 **{category.title()} Challenges:**\n\n"
-
-        for c in challenges:
-            difficulty_emoji = {
-                'easy': '🟢',
-                'medium': '🟡',
-                'hard': '🔴'
-            }.get(c.get('difficulty', 'medium'), '⚪')
-
-            msg += (
-                f"{difficulty_emoji} **{c.get('title')}** "
-                f"({c.get('points', 0)} pts)\n"
-                f"   ID: `{c.get('id')}`\n"
-            )
-
-        msg += f"\nSolve: `!solve <id> <flag>`"
+        lines = [f"🔐 **{category.title()} Challenges:**\n\n"]
+        lines.extend(
+            f"{DIFFICULTY_EMOJI.get(c.get('difficulty', 'medium'), '⚪')} **{c.get('title')}** "
+            f"({c.get('points', 0)} pts)\n"
+            f"   ID: `{c.get('id')}`\n"
+            for c in challenges
+        )
+        lines.append("\nSolve: `!solve <id> <flag>`")
+
+        msg = "".join(lines)
+        self._format_cache[key] = msg
         return msg
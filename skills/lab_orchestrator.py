@@ -1,15 +1,65 @@
 """Docker container orchestration for CTF labs"""
 
+import os
+import json
+import time
+import secrets
+import socket
 import subprocess
 import logging
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
 from typing import Optional, Dict, List
+from urllib.parse import quote
 from config.settings import AVAILABLE_LABS, DOCKER_NETWORK, MAX_LABS_PER_USER, AUTO_CLEANUP_HOURS
 from config.security import DOCKER_SECURITY_OPTS, RESOURCE_LIMITS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over the Docker daemon's Unix socket"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _docker_socket_path() -> Optional[str]:
+    host = os.environ.get("DOCKER_HOST", f"unix://{DEFAULT_DOCKER_SOCKET}")
+    return host[len("unix://"):] if host.startswith("unix://") else None
+
+
+def _container_ip_from_api(name: str) -> Optional[str]:
+    """Read a container's IP straight from the Engine API (no docker CLI process)"""
+    path = _docker_socket_path()
+    if not path or not os.path.exists(path):
+        return None
+
+    conn = _UnixHTTPConnection(path, timeout=10)
+    try:
+        conn.request("GET", f"/containers/{quote(name)}/json")
+        resp = conn.getresponse()
+        if resp.status != 200:
+            return None
+        networks = json.loads(resp.read())["NetworkSettings"]["Networks"]
+        return "".join(n.get("IPAddress", "") for n in networks.values())
+    except (OSError, ValueError, KeyError, http.client.HTTPException) as e:
+        logger.debug("Docker API inspect failed for %s: %s", name, e)
+        return None
+    finally:
+        conn.close()
+
 
 class LabEnvironment:
     """Represents a single CTF lab instance"""
@@ -24,11 +74,12 @@ class LabEnvironment:
         self.image = self.lab_config["image"]
 
         # Generate unique name
-        self.name = f"{lab_type}-{owner}-{datetime.now().strftime('%s')[-4:]}"
+        self.name = f"{lab_type}-{owner}-{secrets.token_hex(2)}"
 
         self.ip_address = None
         self.status = "created"
-        self.started_at = None
+        self.started_at = None  # wall clock, for display
+        self.started_monotonic: Optional[float] = None  # for uptime, immune to clock changes
 
     def start(self) -> bool:
         """Start the Docker container"""
@@ -60,16 +111,20 @@ class LabEnvironment:
                 timeout=30
             )
 
-            # Get container IP
-            ip_result = subprocess.run([
-                "docker", "inspect",
-                "-f", "{{range .NetworkSettings.Networks}}{{.IPAddress}}{{end}}",
-                self.name
-            ], capture_output=True, text=True, check=True, timeout=10)
-
-            self.ip_address = ip_result.stdout.strip()
+            # Get container IP; fall back to the CLI if the daemon socket isn't usable
+            ip_address = _container_ip_from_api(self.name)
+            if ip_address is None:
+                ip_result = subprocess.run([
+                    "docker", "inspect",
+                    "-f", "{{range .NetworkSettings.Networks}}{{.IPAddress}}{{end}}",
+                    self.name
+                ], capture_output=True, text=True, check=True, timeout=10)
+                ip_address = ip_result.stdout.strip()
+
+            self.ip_address = ip_address
             self.status = "running"
             self.started_at = datetime.now()
+            self.started_monotonic = time.monotonic()
 
             logger.info(f"Started lab: {self.name} at {self.ip_address}")
             return True
@@ -115,12 +170,19 @@ class LabEnvironment:
             logger.error(f"Failed to delete {self.name}: {e.stderr}")
             return False
 
-    def get_uptime_hours(self) -> float:
-        """Get lab uptime in hours"""
+    def get_uptime_seconds(self, now: Optional[float] = None) -> float:
+        """Get lab uptime in seconds; `now` is a time.monotonic() reading"""
+        if self.started_monotonic is not None:
+            if now is None:
+                now = time.monotonic()
+            return now - self.started_monotonic
         if not self.started_at:
             return 0
-        delta = datetime.now() - self.started_at
-        return delta.total_seconds() / 3600
+        return (datetime.now() - self.started_at).total_seconds()
+
+    def get_uptime_hours(self, now: Optional[float] = None) -> float:
+        """Get lab uptime in hours"""
+        return self.get_uptime_seconds(now) / 3600
 
 
 class LabManager:
@@ -128,6 +190,32 @@ class LabManager:
 
     def __init__(self):
         self.active_labs: Dict[str, LabEnvironment] = {}
+        # owner -> their lab names in creation order; kept in step with active_labs
+        self._by_owner: Dict[str, List[str]] = {}
+        # Shared across get_status calls so per-lab Docker lookups run side by side
+        self._status_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="lab-status")
+
+    def _add_lab(self, lab: LabEnvironment):
+        self.active_labs[lab.name] = lab
+        self._by_owner.setdefault(lab.owner, []).append(lab.name)
+
+    def _remove_lab(self, lab: LabEnvironment):
+        del self.active_labs[lab.name]
+        names = self._by_owner[lab.owner]
+        names.remove(lab.name)
+        if not names:
+            del self._by_owner[lab.owner]
+
+    def _user_labs(self, owner: str) -> List[LabEnvironment]:
+        """A user's labs, oldest first"""
+        return [self.active_labs[name] for name in self._by_owner.get(owner, ())]
+
+    def _find_user_lab(self, owner: str, lab_type: str, running_only: bool = False) -> Optional[LabEnvironment]:
+        """First of the user's labs with this type (optionally only running ones)"""
+        for lab in self._user_labs(owner):
+            if lab.lab_type == lab_type and (not running_only or lab.status == "running"):
+                return lab
+        return None
 
     def create_lab(self, owner: str, lab_type: str) -> str:
         """Create and start a new lab"""
@@ -138,10 +226,7 @@ class LabManager:
             return f"❌ Unknown lab type. Available: {available}"
 
         # Check user's active labs
-        user_labs = [
-            lab for lab in self.active_labs.values()
-            if lab.owner == owner and lab.status == "running"
-        ]
+        user_labs = [lab for lab in self._user_labs(owner) if lab.status == "running"]
 
         # Enforce per-user limit
         if len(user_labs) >= MAX_LABS_PER_USER:
@@ -156,7 +241,7 @@ class LabManager:
                 logger.info(f"Auto-cleaning up {lab.name} (exceeded {AUTO_CLEANUP_HOURS}h)")
                 lab.stop()
                 lab.delete()
-                del self.active_labs[lab.name]
+                self._remove_lab(lab)
                 return (
                     f"✅ Cleaned up your old {lab.lab_type} lab (ran for {AUTO_CLEANUP_HOURS}+ hours).\n"
                     f"Starting new {lab_type} lab now..."
@@ -167,7 +252,7 @@ class LabManager:
             lab = LabEnvironment(owner, lab_type)
 
             if lab.start():
-                self.active_labs[lab.name] = lab
+                self._add_lab(lab)
                 port = AVAILABLE_LABS[lab_type].get("port", 80)
                 return (
                     f"✅ **{lab.name}** started successfully!\n"
@@ -188,11 +273,7 @@ class LabManager:
         """Stop a running lab"""
 
         # Find user's lab of this type
-        user_lab = None
-        for lab in self.active_labs.values():
-            if lab.owner == owner and lab.lab_type == lab_type and lab.status == "running":
-                user_lab = lab
-                break
+        user_lab = self._find_user_lab(owner, lab_type, running_only=True)
 
         if not user_lab:
             return f"❌ You don't have a running {lab_type} lab."
@@ -206,11 +287,7 @@ class LabManager:
         """Delete a lab (stop + remove)"""
 
         # Find user's lab
-        user_lab = None
-        for lab in self.active_labs.values():
-            if lab.owner == owner and lab.lab_type == lab_type:
-                user_lab = lab
-                break
+        user_lab = self._find_user_lab(owner, lab_type)
 
         if not user_lab:
             return f"❌ You don't have a {lab_type} lab."
@@ -221,7 +298,7 @@ class LabManager:
 
         # Delete
         if user_lab.delete():
-            del self.active_labs[user_lab.name]
+            self._remove_lab(user_lab)
             return f"🗑️ Deleted **{user_lab.name}**"
         else:
             return f"❌ Failed to delete lab. Try again or contact admin."
@@ -229,29 +306,31 @@ class LabManager:
     def get_status(self, owner: str) -> str:
         """Get status of user's labs"""
 
-        user_labs = [
-            lab for lab in self.active_labs.values()
-            if lab.owner == owner
-        ]
+        user_labs = self._user_labs(owner)
 
         if not user_labs:
             return "📋 You have no active labs."
 
-        msg = "📋 **Your Active Labs:**\n"
-        for lab in user_labs:
-            uptime_hours = lab.get_uptime_hours()
-            uptime_str = f"{int(uptime_hours)}h {int((uptime_hours % 1) * 60)}m"
+        now = time.monotonic()
+        lines = self._status_pool.map(self._lab_status_line, user_labs, repeat(now))
+        return "📋 **Your Active Labs:**\n" + "".join(lines)
 
-            status_emoji = "🟢" if lab.status == "running" else "🔴"
-            port = AVAILABLE_LABS[lab.lab_type].get("port", 80)
+    def _lab_status_line(self, lab: LabEnvironment, now: float) -> str:
+        """One line of get_status output; runs on the status pool"""
+        if lab.status == "running" and not lab.ip_address:
+            lab.ip_address = _container_ip_from_api(lab.name)
 
-            msg += (
-                f"{status_emoji} **{lab.lab_type}** | "
-                f"`{lab.ip_address}:{port}` | "
-                f"Uptime: {uptime_str}\n"
-            )
+        hours, rem = divmod(int(lab.get_uptime_seconds(now)), 3600)
+        uptime_str = f"{hours}h {rem // 60}m"
 
-        return msg
+        status_emoji = "🟢" if lab.status == "running" else "🔴"
+        port = AVAILABLE_LABS[lab.lab_type].get("port", 80)
+
+        return (
+            f"{status_emoji} **{lab.lab_type}** | "
+            f"`{lab.ip_address}:{port}` | "
+            f"Uptime: {uptime_str}\n"
+        )
 
     def list_available(self) -> str:
         """List available lab types"""
@@ -271,9 +350,27 @@ class LabManager:
 
     def cleanup_old_labs(self):
         """Clean up labs exceeding max uptime (for cron job)"""
-        for lab in list(self.active_labs.values()):
-            if lab.get_uptime_hours() > AUTO_CLEANUP_HOURS:
-                logger.info(f"Auto-cleanup: {lab.name} exceeded {AUTO_CLEANUP_HOURS}h")
-                lab.stop()
-                lab.delete()
-                del self.active_labs[lab.name]
+        now = time.monotonic()
+        expired = [lab for lab in self.active_labs.values() if lab.get_uptime_hours(now) > AUTO_CLEANUP_HOURS]
+        if not expired:
+            return
+
+        # One `docker rm -f` for the whole sweep instead of a stop + rm per lab
+        try:
+            result = subprocess.run(
+                ["docker", "rm", "-f", *(lab.name for lab in expired)],
+                capture_output=True,
+                text=True,
+                timeout=60
+            )
+        except subprocess.TimeoutExpired:
+            logger.error(f"Auto-cleanup of {len(expired)} labs timed out; retrying next sweep")
+            return
+
+        if result.returncode != 0:
+            logger.error(f"Auto-cleanup: docker rm reported errors: {result.stderr.strip()}")
+
+        for lab in expired:
+            lab.status = "deleted"
+            self._remove_lab(lab)
+        logger.info(f"Auto-cleanup: removed {len(expired)} labs older than {AUTO_CLEANUP_HOURS}h")
@@ -1,139 +1,344 @@
 """User statistics and leaderboard management"""
 
+import os
 import json
+import time
 import logging
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from config.settings import DATA_DIR
+from typing import Dict, List, Optional, Set, Tuple
+from config.settings import DATA_DIR, STATS_FORMAT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson  # optional speedup; its decode error subclasses json.JSONDecodeError
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # optional: STATS_FORMAT=msgpack
+except ImportError:
+    msgpack = None
+
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# Fold the event journal into the snapshot after this many appended events
+COMPACT_EVERY = 500
+
+# Leaderboard markers for the top three places
+MEDALS = ("👑", "🥈", "🥉")
+
+
+@dataclass(slots=True)
+class UserStats:
+    """One player's stats; a plain dict in the snapshot (see to_dict)"""
+    total_points: int = 0
+    solves: List[dict] = field(default_factory=list)
+    solve_count: int = 0
+    categories: Dict[str, int] = field(default_factory=dict)
+    labs_started: int = 0
+    first_seen: str = ""
+    # Ids from `solves`, for O(1) repeat checks; rebuilt on load, never saved
+    solved_ids: Set[str] = field(default_factory=set, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserStats":
+        solves = data.get("solves", [])
+        return cls(
+            total_points=data.get("total_points", 0),
+            solves=solves,
+            solve_count=data.get("solve_count", len(solves)),  # snapshots from before solve_count
+            categories=data.get("categories", {}),
+            labs_started=data.get("labs_started", 0),
+            first_seen=data.get("first_seen", ""),
+            solved_ids={s["challenge_id"] for s in solves},
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "total_points": self.total_points,
+            "solves": self.solves,
+            "solve_count": self.solve_count,
+            "categories": self.categories,
+            "labs_started": self.labs_started,
+            "first_seen": self.first_seen,
+        }
+
 
 class StatsManager:
-    """Manages user statistics and points"""
+    """Manages user statistics and points
+
+    Changes are appended as one-line events to a journal next to the
+    snapshot (user_stats.log beside user_stats.json). The snapshot is only
+    rewritten on startup and every COMPACT_EVERY events.
+    """
 
-    def __init__(self):
-        self.stats_file = DATA_DIR / "user_stats.json"
-        self.stats: Dict[str, dict] = {}
-        self._load_stats()
+    def __init__(self, stats_file: Optional[Path] = None, load: bool = True):
+        """stats_file overrides the default snapshot path; load=False starts with empty stats"""
+        if stats_file is None:
+            use_msgpack = STATS_FORMAT == "msgpack"
+            if use_msgpack and msgpack is None:
+                logger.warning("STATS_FORMAT=msgpack but msgpack is not installed; using JSON")
+                use_msgpack = False
+            stats_file = DATA_DIR / ("user_stats.msgpack" if use_msgpack else "user_stats.json")
+        self.stats_file = Path(stats_file)
+        self.stats: Dict[str, UserStats] = {}
+        # (-total_points, username) for every user, kept sorted best-first
+        self._leaderboard: List[Tuple[int, str]] = []
+        # Rendered messages: format_leaderboard by limit, format_user_stats by username.
+        # _apply_event drops whatever a change makes stale.
+        self._leaderboard_text: Dict[int, str] = {}
+        self._user_stats_text: Dict[str, str] = {}
+        self._journal = None  # append handle, opened on first event
+        self._journal_path: Optional[Path] = None
+        self._pending_events = 0
+        if load:
+            self._load_stats()
+
+    def _journal_file(self) -> Path:
+        return Path(self.stats_file).with_suffix(".log")
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> dict:
+        """Decode a snapshot; the file extension says which format it is in"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.suffix == ".msgpack":
+            return msgpack.unpackb(data, raw=False)
+        return _json_loads(data)
 
     def _load_stats(self):
-        """Load stats from JSON file"""
-        if self.stats_file.exists():
+        """Load the stats snapshot, then replay and compact the journal"""
+        snapshot = Path(self.stats_file)
+        # After a STATS_FORMAT change, start from the other format's snapshot if it is newer
+        other = snapshot.with_suffix(".json" if snapshot.suffix == ".msgpack" else ".msgpack")
+        if other.exists() and (other.suffix == ".json" or msgpack is not None):
+            if not snapshot.exists() or other.stat().st_mtime_ns > snapshot.stat().st_mtime_ns:
+                snapshot = other
+
+        if snapshot.exists():
             try:
-                with open(self.stats_file, 'r') as f:
-                    self.stats = json.load(f)
+                self.stats = {name: UserStats.from_dict(data) for name, data in self._read_snapshot(snapshot).items()}
                 logger.info(f"Loaded stats for {len(self.stats)} users")
-            except json.JSONDecodeError as e:
+            except ValueError as e:
                 logger.error(f"Error loading stats: {e}")
                 self.stats = {}
+                snapshot = Path(self.stats_file)  # nothing to migrate; leave the bad file be
         else:
             self.stats = {}
 
-    def _save_stats(self):
-        """Save stats to JSON file"""
+        self._leaderboard = sorted((-user.total_points, name) for name, user in self.stats.items())
+        self._leaderboard_text.clear()
+        self._user_stats_text.clear()
+
+        journal = self._journal_file()
+        replayed = 0
+        if journal.exists():
+            with open(journal, 'rb') as f:
+                for line in f:
+                    try:
+                        self._apply_event(_json_loads(line))
+                        replayed += 1
+                    except (ValueError, KeyError) as e:
+                        # A crash mid-write can leave a torn last line
+                        logger.error(f"Skipping bad stats journal line: {e}")
+            if replayed:
+                logger.info(f"Replayed {replayed} stats events")
+
+        if snapshot != Path(self.stats_file):
+            # Migrate now; the old-format file would go stale once the journal is compacted
+            if self._save_stats():
+                snapshot.unlink(missing_ok=True)
+                logger.info(f"Migrated stats from {snapshot.name} to {Path(self.stats_file).name}")
+        elif replayed:
+            self._save_stats()
+
+    def _save_stats(self) -> bool:
+        """Write the full snapshot and empty the journal; False if the write failed"""
+        tmp = Path(self.stats_file).with_suffix(".tmp")
+        snapshot = {name: user.to_dict() for name, user in self.stats.items()}
         try:
-            with open(self.stats_file, 'w') as f:
-                json.dump(self.stats, f, indent=2)
+            if Path(self.stats_file).suffix == ".msgpack":
+                data = msgpack.packb(snapshot, use_bin_type=True)
+            else:
+                data = _json_dumps(snapshot, indent=True)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self.stats_file)
         except Exception as e:
             logger.error(f"Error saving stats: {e}")
+            return False
 
-    def _ensure_user(self, username: str):
-        """Ensure user exists in stats"""
-        if username not in self.stats:
-            self.stats[username] = {
-                "total_points": 0,
-                "solves": [],
-                "categories": {},
-                "labs_started": 0,
-                "first_seen": datetime.now().isoformat(),
-            }
+        # A crash between the replace and this truncate replays the journal
+        # once more; solves are deduplicated, lab start counts are not
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        open(self._journal_file(), 'w').close()
+        self._pending_events = 0
+        return True
 
-    def record_solve(self, username: str, challenge_id: str, points: int, category: str) -> bool:
-        """Record a successful challenge solve"""
-        self._ensure_user(username)
+    def _append_event(self, event: dict):
+        """Journal one change (a single write), compacting every COMPACT_EVERY events"""
+        path = self._journal_file()
+        if self._journal is None or self._journal_path != path:
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(path, 'ab', buffering=0)  # each event is one write()
+            self._journal_path = path
+
+        try:
+            self._journal.write(_json_dumps(event) + b"\n")
+        except Exception as e:
+            logger.error(f"Error journaling stats event: {e}")
+            return
+
+        self._pending_events += 1
+        if self._pending_events >= COMPACT_EVERY:
+            self._save_stats()
+
+    def _apply_event(self, event: dict) -> bool:
+        """Apply a journaled change to self.stats; False if it was a repeat solve"""
+        username = event["u"]
+        user = self._ensure_user(username, event["ts"])
+        self._user_stats_text.pop(username, None)
+
+        if event["t"] == "lab":
+            user.labs_started += 1
+            return True
+
+        challenge_id, points, category = event["c"], event["p"], event["cat"]
 
         # Check if already solved
-        solved_ids = [s['challenge_id'] for s in self.stats[username]['solves']]
-        if challenge_id in solved_ids:
+        if challenge_id in user.solved_ids:
             return False  # Already solved
+        user.solved_ids.add(challenge_id)
+        self._leaderboard_text.clear()
 
-        # Add points
-        self.stats[username]['total_points'] += points
+        # Add points, moving the user's leaderboard entry to match
+        old_points = user.total_points
+        del self._leaderboard[bisect_left(self._leaderboard, (-old_points, username))]
+        user.total_points = old_points + points
+        insort(self._leaderboard, (-(old_points + points), username))
 
         # Record solve
-        self.stats[username]['solves'].append({
+        user.solves.append({
             "challenge_id": challenge_id,
             "points": points,
             "category": category,
-            "timestamp": datetime.now().isoformat()
+            "ts": event["ts"]  # epoch seconds; older entries have an ISO "timestamp"
         })
+        user.solve_count += 1
 
         # Update category stats
-        if category not in self.stats[username]['categories']:
-            self.stats[username]['categories'][category] = 0
-        self.stats[username]['categories'][category] += points
+        categories = user.categories
+        categories[category] = categories.get(category, 0) + points
+        return True
+
+    def _ensure_user(self, username: str, first_seen: Optional[float] = None) -> UserStats:
+        """Ensure user exists in stats; returns their stats"""
+        user = self.stats.get(username)
+        if user is None:
+            user = self.stats[username] = UserStats(
+                first_seen=datetime.fromtimestamp(first_seen or time.time()).isoformat(),
+            )
+            insort(self._leaderboard, (0, username))
+            self._leaderboard_text.clear()
+        return user
+
+    def record_solve(self, username: str, challenge_id: str, points: int, category: str) -> bool:
+        """Record a successful challenge solve"""
+        event = {
+            "t": "solve",
+            "u": username,
+            "c": challenge_id,
+            "p": points,
+            "cat": category,
+            "ts": time.time(),
+        }
+        if not self._apply_event(event):
+            return False
 
-        self._save_stats()
+        self._append_event(event)
         logger.info(f"Recorded solve: {username} - {challenge_id} (+{points} pts)")
         return True
 
     def record_lab_start(self, username: str):
         """Record that user started a lab"""
-        self._ensure_user(username)
-        self.stats[username]['labs_started'] += 1
-        self._save_stats()
+        event = {"t": "lab", "u": username, "ts": time.time()}
+        self._apply_event(event)
+        self._append_event(event)
 
-    def get_leaderboard(self, limit: int = 10) -> List[Tuple[str, dict]]:
+    def get_leaderboard(self, limit: int = 10) -> List[Tuple[str, UserStats]]:
         """Get top players by points"""
-        sorted_users = sorted(
-            self.stats.items(),
-            key=lambda x: x[1]['total_points'],
-            reverse=True
-        )
-        return sorted_users[:limit]
+        return [(username, self.stats[username]) for _, username in self._leaderboard[:limit]]
 
-    def get_user_stats(self, username: str) -> Optional[dict]:
+    def get_user_stats(self, username: str) -> Optional[UserStats]:
         """Get stats for a specific user"""
         return self.stats.get(username)
 
     def format_leaderboard(self, limit: int = 10) -> str:
         """Format leaderboard for Discord"""
+        cached = self._leaderboard_text.get(limit)
+        if cached is not None:
+            return cached
+
         leaders = self.get_leaderboard(limit)
 
         if not leaders:
             return "📊 No stats yet. Be the first to solve a challenge!"
 
-        msg = "🏆 **Top Players**\n\n"
-
-        medals = ["👑", "🥈", "🥉"]
+        parts = ["🏆 **Top Players**\n\n"]
 
         for i, (username, data) in enumerate(leaders, 1):
-            medal = medals[i-1] if i <= 3 else f"{i}."
-            points = data['total_points']
-            solves = len(data['solves'])
+            medal = MEDALS[i-1] if i <= len(MEDALS) else f"{i}."
+            points = data.total_points
+            solves = data.solve_count
 
-            msg += f"{medal} **{username}** - {points} pts ({solves} solves)\n"
+            parts.append(f"{medal} **{username}** - {points} pts ({solves} solves)\n")
 
+        msg = self._leaderboard_text[limit] = "".join(parts)
         return msg
 
     def format_user_stats(self, username: str) -> str:
         """Format user stats for Discord"""
+        cached = self._user_stats_text.get(username)
+        if cached is not None:
+            return cached
+
         data = self.get_user_stats(username)
 
         if not data:
             return f"📊 No stats for {username}. Start solving challenges!"
 
-        msg = f"📊 **{username}'s Stats**\n\n"
-        msg += f"**Total Points:** {data['total_points']}\n"
-        msg += f"**Challenges Solved:** {len(data['solves'])}\n"
-        msg += f"**Labs Started:** {data.get('labs_started', 0)}\n\n"
+        parts = [
+            f"📊 **{username}'s Stats**\n\n",
+            f"**Total Points:** {data.total_points}\n",
+            f"**Challenges Solved:** {data.solve_count}\n",
+            f"**Labs Started:** {data.labs_started}\n\n",
+        ]
 
-        if data['categories']:
-            msg += "**By Category:**\n"
-            for cat, pts in sorted(data['categories'].items(), key=lambda x: x[1], reverse=True):
-                msg += f"  • {cat}: {pts} pts\n"
+        if data.categories:
+            parts.append("**By Category:**\n")
+            parts.extend(
+                f"  • {cat}: {pts} pts\n"
+                for cat, pts in sorted(data.categories.items(), key=lambda x: x[1], reverse=True)
+            )
 
+        msg = self._user_stats_text[username] = "".join(parts)
         return msg
@@ -1,33 +1,41 @@
-#!/usr/bin/env python3
 """
 Test suite for Bagley challenge and stats systems
+
+Run with: PYTHONPATH=. python3 -m pytest tests/test_challenges.py
 """
 
 import sys
 import os
 import json
-import tempfile
-import shutil
+from types import SimpleNamespace
+
+import pytest
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from skills import challenge_manager as challenge_module
 from skills.challenge_manager import ChallengeManager
+from skills import stats_manager as stats_module
 from skills.stats_manager import StatsManager
 
 
 # ── Challenge Manager Tests ─────────────────────────────────────
 
-def test_challenges_loaded():
+@pytest.fixture(scope="module")
+def cm():
+    """One ChallengeManager for the read-only tests below, so challenges load once"""
+    return ChallengeManager()
+
+
+def test_challenges_loaded(cm):
     """Test that challenges are loaded from disk"""
-    cm = ChallengeManager()
     assert len(cm.challenges) > 0, "No challenges loaded"
     print(f"✅ test_challenges_loaded passed ({len(cm.challenges)} challenges)")
 
 
-def test_list_categories():
+def test_list_categories(cm):
     """Test listing challenge categories"""
-    cm = ChallengeManager()
     cats = cm.list_categories()
     assert isinstance(cats, list)
     assert len(cats) > 0
@@ -35,9 +43,8 @@ def test_list_categories():
     print(f"✅ test_list_categories passed ({cats})")
 
 
-def test_get_challenges_by_category():
+def test_get_challenges_by_category(cm):
     """Test filtering challenges by category"""
-    cm = ChallengeManager()
     crypto = cm.get_challenges_by_category("cryptography")
     assert len(crypto) > 0
     for c in crypto:
@@ -45,9 +52,8 @@ def test_get_challenges_by_category():
     print("✅ test_get_challenges_by_category passed")
 
 
-def test_get_challenge_by_id():
+def test_get_challenge_by_id(cm):
     """Test fetching a specific challenge"""
-    cm = ChallengeManager()
     challenge = cm.get_challenge("crypto-001")
     assert challenge is not None
     assert challenge["title"] == "Caesar's Secret"
@@ -55,38 +61,33 @@ def test_get_challenge_by_id():
     print("✅ test_get_challenge_by_id passed")
 
 
-def test_get_challenge_not_found():
+def test_get_challenge_not_found(cm):
     """Test fetching a non-existent challenge"""
-    cm = ChallengeManager()
     challenge = cm.get_challenge("nonexistent-999")
     assert challenge is None
     print("✅ test_get_challenge_not_found passed")
 
 
-def test_check_flag_correct():
+def test_check_flag_correct(cm):
     """Test correct flag submission"""
-    cm = ChallengeManager()
     assert cm.check_flag("crypto-001", "flag{the_quick_brown_fox_jumps_over_the_lazy_dog}") is True
     print("✅ test_check_flag_correct passed")
 
 
-def test_check_flag_incorrect():
+def test_check_flag_incorrect(cm):
     """Test incorrect flag submission"""
-    cm = ChallengeManager()
     assert cm.check_flag("crypto-001", "flag{wrong_answer}") is False
     print("✅ test_check_flag_incorrect passed")
 
 
-def test_check_flag_whitespace():
+def test_check_flag_whitespace(cm):
     """Test flag with extra whitespace"""
-    cm = ChallengeManager()
     assert cm.check_flag("crypto-001", "  flag{the_quick_brown_fox_jumps_over_the_lazy_dog}  ") is True
     print("✅ test_check_flag_whitespace passed")
 
 
-def test_get_hint():
+def test_get_hint(cm):
     """Test getting hints"""
-    cm = ChallengeManager()
     hint0 = cm.get_hint("crypto-001", 0)
     assert hint0 is not None
     assert "shift" in hint0.lower() or "classic" in hint0.lower()
@@ -100,98 +101,112 @@ def test_get_hint():
     print("✅ test_get_hint passed")
 
 
-def test_format_challenge_list():
+def test_format_challenge_list(cm):
     """Test Discord formatting of challenge list"""
-    cm = ChallengeManager()
     result = cm.format_challenge_list("cryptography")
     assert "Cryptography" in result
     assert "crypto-001" in result
     print("✅ test_format_challenge_list passed")
 
 
-def test_format_challenge_list_empty():
+def test_format_challenge_list_empty(cm):
     """Test formatting for non-existent category"""
-    cm = ChallengeManager()
     result = cm.format_challenge_list("nonexistent")
     assert "No challenges found" in result
     print("✅ test_format_challenge_list_empty passed")
 
 
+@pytest.fixture
+def tmp_challenges(tmp_path, monkeypatch):
+    """Point ChallengeManager at an empty challenges dir (and pack file) under tmp_path"""
+    monkeypatch.setattr(challenge_module, "CHALLENGES_DIR", tmp_path)
+    monkeypatch.setattr(challenge_module, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+def test_large_challenge_loaded_as_summary(tmp_challenges):
+    """Test that large challenge files keep only summary fields in memory"""
+    (tmp_challenges / "forensics").mkdir()
+    big = {
+        "id": "big-001", "title": "Big Dump", "category": "forensics",
+        "difficulty": "hard", "points": 300, "flag": "flag{big}",
+        "hints": ["Look closer"], "writeup": "x" * (128 * 1024),
+    }
+    (tmp_challenges / "forensics" / "big-001.json").write_text(json.dumps(big))
+
+    cm = ChallengeManager()
+
+    assert "writeup" not in cm.challenges["big-001"]
+    assert cm.get_challenge("big-001")["writeup"] == big["writeup"]
+    assert cm.check_flag("big-001", "flag{big}") is True
+    assert "big-001" in cm.format_challenge_list("forensics")
+    print("✅ test_large_challenge_loaded_as_summary passed")
+
+
+def test_challenge_pack_rebuilt_on_change(tmp_challenges):
+    """Test that the challenge pack is reused until a source file changes"""
+    (tmp_challenges / "osint").mkdir()
+    path = tmp_challenges / "osint" / "osint-001.json"
+    path.write_text(json.dumps({"id": "osint-001", "category": "osint", "points": 100, "flag": "flag{a}"}))
+
+    ChallengeManager()
+    assert (tmp_challenges / "challenges.pack.json").exists()
+    assert ChallengeManager().check_flag("osint-001", "flag{a}") is True
+
+    path.write_text(json.dumps({"id": "osint-001", "category": "osint", "points": 150, "flag": "flag{bb}"}))
+    cm = ChallengeManager()
+    assert cm.check_flag("osint-001", "flag{bb}") is True
+    assert cm.get_challenge("osint-001")["points"] == 150
+    print("✅ test_challenge_pack_rebuilt_on_change passed")
+
+
 # ── Stats Manager Tests ─────────────────────────────────────────
 
-def test_stats_record_solve():
-    """Test recording a solve"""
-    sm = StatsManager()
-    # Use a temp stats file to avoid polluting real data
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
+@pytest.fixture
+def sm(tmp_path):
+    """A StatsManager with empty stats, writing under tmp_path"""
+    return StatsManager(stats_file=tmp_path / "stats.json", load=False)
 
+
+def test_stats_record_solve(sm):
+    """Test recording a solve"""
     result = sm.record_solve("alice", "crypto-001", 100, "cryptography")
     assert result is True
-    assert sm.stats["alice"]["total_points"] == 100
-    assert len(sm.stats["alice"]["solves"]) == 1
-
-    # Clean up
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
+    assert sm.stats["alice"].total_points == 100
+    assert len(sm.stats["alice"].solves) == 1
     print("✅ test_stats_record_solve passed")
 
 
-def test_stats_duplicate_solve():
+def test_stats_duplicate_solve(sm):
     """Test that duplicate solves are rejected"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_solve("alice", "crypto-001", 100, "cryptography")
     result = sm.record_solve("alice", "crypto-001", 100, "cryptography")
     assert result is False
-    assert sm.stats["alice"]["total_points"] == 100  # Not doubled
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
+    assert sm.stats["alice"].total_points == 100  # Not doubled
     print("✅ test_stats_duplicate_solve passed")
 
 
-def test_stats_multiple_solves():
+def test_stats_multiple_solves(sm):
     """Test recording multiple different solves"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_solve("alice", "crypto-001", 100, "cryptography")
     sm.record_solve("alice", "osint-001", 150, "osint")
-    assert sm.stats["alice"]["total_points"] == 250
-    assert len(sm.stats["alice"]["solves"]) == 2
-    assert sm.stats["alice"]["categories"]["cryptography"] == 100
-    assert sm.stats["alice"]["categories"]["osint"] == 150
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
+    assert sm.stats["alice"].total_points == 250
+    assert len(sm.stats["alice"].solves) == 2
+    assert sm.stats["alice"].categories["cryptography"] == 100
+    assert sm.stats["alice"].categories["osint"] == 150
     print("✅ test_stats_multiple_solves passed")
 
 
-def test_stats_lab_start():
+def test_stats_lab_start(sm):
     """Test recording lab starts"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_lab_start("alice")
     sm.record_lab_start("alice")
-    assert sm.stats["alice"]["labs_started"] == 2
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
+    assert sm.stats["alice"].labs_started == 2
     print("✅ test_stats_lab_start passed")
 
 
-def test_leaderboard():
+def test_leaderboard(sm):
     """Test leaderboard generation"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_solve("alice", "crypto-001", 100, "cryptography")
     sm.record_solve("bob", "crypto-001", 100, "cryptography")
     sm.record_solve("bob", "osint-001", 150, "osint")
@@ -199,125 +214,94 @@ def test_leaderboard():
     leaders = sm.get_leaderboard(10)
     assert len(leaders) == 2
     assert leaders[0][0] == "bob"  # Bob has more points
-    assert leaders[0][1]["total_points"] == 250
+    assert leaders[0][1].total_points == 250
     assert leaders[1][0] == "alice"
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
     print("✅ test_leaderboard passed")
 
 
-def test_format_leaderboard():
+def test_format_leaderboard(sm):
     """Test Discord leaderboard formatting"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_solve("alice", "crypto-001", 100, "cryptography")
     result = sm.format_leaderboard()
     assert "alice" in result
     assert "100" in result
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
     print("✅ test_format_leaderboard passed")
 
 
-def test_format_leaderboard_empty():
+def test_format_leaderboard_empty(sm):
     """Test leaderboard when empty"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     result = sm.format_leaderboard()
     assert "No stats yet" in result
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
     print("✅ test_format_leaderboard_empty passed")
 
 
-def test_format_user_stats():
+def test_format_user_stats(sm):
     """Test user stats formatting"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     sm.record_solve("alice", "crypto-001", 100, "cryptography")
     sm.record_lab_start("alice")
     result = sm.format_user_stats("alice")
     assert "alice" in result
     assert "100" in result
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
     print("✅ test_format_user_stats passed")
 
 
-def test_format_user_stats_unknown():
+def test_format_user_stats_unknown(sm):
     """Test stats for unknown user"""
-    sm = StatsManager()
-    sm.stats = {}
-    sm.stats_file = tempfile.mktemp(suffix=".json")
-
     result = sm.format_user_stats("nobody")
     assert "No stats" in result
-
-    if os.path.exists(sm.stats_file):
-        os.remove(sm.stats_file)
     print("✅ test_format_user_stats_unknown passed")
 
 
-# ── Runner ──────────────────────────────────────────────────────
-
-def run_all_tests():
-    """Run all tests"""
-    tests = [
-        # Challenge Manager
-        test_challenges_loaded,
-        test_list_categories,
-        test_get_challenges_by_category,
-        test_get_challenge_by_id,
-        test_get_challenge_not_found,
-        test_check_flag_correct,
-        test_check_flag_incorrect,
-        test_check_flag_whitespace,
-        test_get_hint,
-        test_format_challenge_list,
-        test_format_challenge_list_empty,
-        # Stats Manager
-        test_stats_record_solve,
-        test_stats_duplicate_solve,
-        test_stats_multiple_solves,
-        test_stats_lab_start,
-        test_leaderboard,
-        test_format_leaderboard,
-        test_format_leaderboard_empty,
-        test_format_user_stats,
-        test_format_user_stats_unknown,
-    ]
-
-    print("🧪 Running Bagley challenge & stats tests...\n")
-    failed = 0
-
-    for test in tests:
-        try:
-            test()
-        except AssertionError as e:
-            print(f"❌ {test.__name__} failed: {e}")
-            failed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__} error: {e}")
-            failed += 1
-
-    print(f"\n{'='*50}")
-    if failed == 0:
-        print(f"🎉 All {len(tests)} tests passed!")
-        return 0
-    else:
-        print(f"💥 {failed}/{len(tests)} test(s) failed")
-        return 1
-
-
-if __name__ == "__main__":
-    sys.exit(run_all_tests())
+def test_formatted_stats_refresh_after_changes(sm):
+    """Test that cached leaderboard/user stats text is redrawn after a change"""
+    sm.record_solve("alice", "crypto-001", 100, "cryptography")
+    assert "100 pts" in sm.format_leaderboard()
+    assert "**Labs Started:** 0" in sm.format_user_stats("alice")
+
+    sm.record_solve("alice", "osint-001", 150, "osint")
+    sm.record_lab_start("alice")
+    sm.record_lab_start("bob")
+    assert "250 pts" in sm.format_leaderboard()
+    assert "bob" in sm.format_leaderboard()
+    assert "**Labs Started:** 1" in sm.format_user_stats("alice")
+    print("✅ test_formatted_stats_refresh_after_changes passed")
+
+
+def test_stats_journal_replayed_on_load(sm):
+    """Test that journaled solves survive a restart and get compacted"""
+    sm.record_solve("alice", "crypto-001", 100, "cryptography")
+    sm.record_lab_start("alice")
+    assert not sm.stats_file.exists()  # only the journal was written
+
+    reloaded = StatsManager(stats_file=sm.stats_file)
+    assert reloaded.stats["alice"].total_points == 100
+    assert reloaded.stats["alice"].labs_started == 1
+    assert sm.stats_file.exists()
+    assert sm._journal_file().stat().st_size == 0
+    print("✅ test_stats_journal_replayed_on_load passed")
+
+
+def test_stats_format_switch_keeps_newest(tmp_path, monkeypatch):
+    """Test that switching STATS_FORMAT back and forth never loads a stale snapshot"""
+    # A JSON-backed stand-in, so the test runs without msgpack installed
+    fake_msgpack = SimpleNamespace(
+        packb=lambda obj, **kw: json.dumps(obj).encode(),
+        unpackb=lambda data, **kw: json.loads(data),
+    )
+    monkeypatch.setattr(stats_module, "msgpack", fake_msgpack)
+    as_json = tmp_path / "user_stats.json"
+    as_msgpack = tmp_path / "user_stats.msgpack"
+
+    StatsManager(stats_file=as_json).record_solve("alice", "crypto-001", 100, "cryptography")
+    StatsManager(stats_file=as_json)  # compacts into user_stats.json
+
+    switched = StatsManager(stats_file=as_msgpack)
+    assert switched.stats["alice"].total_points == 100
+    assert as_msgpack.exists() and not as_json.exists()
+    switched.record_solve("alice", "crypto-002", 50, "cryptography")
+    StatsManager(stats_file=as_msgpack)  # compacts into user_stats.msgpack
+
+    switched_back = StatsManager(stats_file=as_json)
+    assert switched_back.stats["alice"].total_points == 150
+    assert as_json.exists() and not as_msgpack.exists()
+    print("✅ test_stats_format_switch_keeps_newest passed")
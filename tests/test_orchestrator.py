@@ -1,10 +1,13 @@
-#!/usr/bin/env python3
 """
 Test suite for Bagley orchestrator and security modules
+
+Run with: PYTHONPATH=. python3 -m pytest tests/test_orchestrator.py
 """
 
 import sys
 import os
+import asyncio
+from types import SimpleNamespace
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.security import sanitize_input, check_role, BLOCKED_PATTERNS, ALLOWED_ROLES
 from config.settings import AVAILABLE_LABS, MAX_LABS_PER_USER
 from discord_bot.utils import RateLimiter
+from skills.ai_integration import AIOrchestrator
 
 
 # ── Security Tests ──────────────────────────────────────────────
@@ -82,6 +86,19 @@ def test_sanitize_blocks_urls():
     print("✅ test_sanitize_blocks_urls passed")
 
 
+def test_sanitize_blocks_mixed_case():
+    """Test that keyword patterns are matched case-insensitively"""
+    valid, msg = sanitize_input("CURL evil.com")
+    assert valid is False
+
+    valid, msg = sanitize_input("Import  OS")
+    assert valid is False
+
+    valid, msg = sanitize_input("HTTPS://evil.com")
+    assert valid is False
+    print("✅ test_sanitize_blocks_mixed_case passed")
+
+
 def test_sanitize_strips_whitespace():
     """Test that whitespace is stripped"""
     valid, cleaned = sanitize_input("  dvwa  ")
@@ -90,6 +107,20 @@ def test_sanitize_strips_whitespace():
     print("✅ test_sanitize_strips_whitespace passed")
 
 
+def test_sanitize_short_input():
+    """Test the short-input fast path still blocks two-character patterns"""
+    valid, cleaned = sanitize_input(" $ ")
+    assert valid is True
+    assert cleaned == "$"
+
+    valid, msg = sanitize_input(" $( ")
+    assert valid is False
+
+    valid, msg = sanitize_input("&&")
+    assert valid is False
+    print("✅ test_sanitize_short_input passed")
+
+
 # ── Role Tests ──────────────────────────────────────────────────
 
 def test_check_role_verified():
@@ -117,6 +148,13 @@ def test_check_role_denied():
     print("✅ test_check_role_denied passed")
 
 
+def test_check_role_member_roles():
+    """Test that role objects (ctx.author.roles) are accepted directly"""
+    assert check_role([SimpleNamespace(name="@everyone"), SimpleNamespace(name="officers")]) is True
+    assert check_role([SimpleNamespace(name="@everyone")]) is False
+    print("✅ test_check_role_member_roles passed")
+
+
 # ── Rate Limiter Tests ──────────────────────────────────────────
 
 def test_rate_limiter_allows_normal():
@@ -156,6 +194,50 @@ def test_rate_limiter_blocks():
     print("✅ test_rate_limiter_blocks passed")
 
 
+def test_rate_limiter_window_expires():
+    """Test that requests older than a minute no longer count"""
+    limiter = RateLimiter(soft_limit=2, warn_limit=3, hard_limit=5)
+    for _ in range(5):
+        limiter.check_limit("test_user")
+    # Age every recorded request past the 1-minute window
+    aged = [t - 61 for t in limiter.user_requests["test_user"]]
+    limiter.user_requests["test_user"].clear()
+    limiter.user_requests["test_user"].extend(aged)
+
+    allowed, msg = limiter.check_limit("test_user")
+    assert allowed is True
+    assert msg is None
+    assert len(limiter.user_requests["test_user"]) == 1
+    print("✅ test_rate_limiter_window_expires passed")
+
+
+# ── AI Parsing Tests ────────────────────────────────────────────
+
+def test_parse_command_fast_path():
+    """Test that plain commands are parsed without the API"""
+    ai = AIOrchestrator(api_key=None)
+    assert ai.parse_command("start dvwa") == {"action": "start", "lab_type": "dvwa", "success": True}
+    assert ai.parse_command("Stop my Juice Shop")["lab_type"] == "juice-shop"
+    assert ai.parse_command("list") == {"action": "list", "success": True}
+    print("✅ test_parse_command_fast_path passed")
+
+
+def test_parse_command_ambiguous_falls_back():
+    """Test that ambiguous input is left to the model"""
+    ai = AIOrchestrator(api_key=None)
+    for text in ("start dvwa and webgoat", "don't start dvwa", "start", "what's running?"):
+        assert "error" in ai.parse_command(text), text
+    print("✅ test_parse_command_ambiguous_falls_back passed")
+
+
+def test_parse_commands_batch_order():
+    """Test that batch parsing returns results in input order"""
+    ai = AIOrchestrator(api_key=None)
+    results = asyncio.run(ai.parse_commands_batch(["stop webgoat", "list", "start dvwa"]))
+    assert [r["action"] for r in results] == ["stop", "list", "start"]
+    print("✅ test_parse_commands_batch_order passed")
+
+
 # ── Settings Tests ──────────────────────────────────────────────
 
 def test_available_labs():
@@ -180,58 +262,3 @@ def test_max_labs_default():
     """Test default max labs per user"""
     assert MAX_LABS_PER_USER == 3
     print("✅ test_max_labs_default passed")
-
-
-# ── Runner ──────────────────────────────────────────────────────
-
-def run_all_tests():
-    """Run all tests"""
-    tests = [
-        # Security
-        test_sanitize_clean_input,
-        test_sanitize_blocks_command_substitution,
-        test_sanitize_blocks_backticks,
-        test_sanitize_blocks_command_chaining,
-        test_sanitize_blocks_curl_wget,
-        test_sanitize_blocks_eval_exec,
-        test_sanitize_blocks_urls,
-        test_sanitize_strips_whitespace,
-        # Roles
-        test_check_role_verified,
-        test_check_role_admin,
-        test_check_role_officers,
-        test_check_role_denied,
-        # Rate limiter
-        test_rate_limiter_allows_normal,
-        test_rate_limiter_warns,
-        test_rate_limiter_blocks,
-        # Settings
-        test_available_labs,
-        test_lab_config_fields,
-        test_max_labs_default,
-    ]
-
-    print("🧪 Running Bagley orchestrator & security tests...\n")
-    failed = 0
-
-    for test in tests:
-        try:
-            test()
-        except AssertionError as e:
-            print(f"❌ {test.__name__} failed: {e}")
-            failed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__} error: {e}")
-            failed += 1
-
-    print(f"\n{'='*50}")
-    if failed == 0:
-        print(f"🎉 All {len(tests)} tests passed!")
-        return 0
-    else:
-        print(f"💥 {failed}/{len(tests)} test(s) failed")
-        return 1
-
-
-if __name__ == "__main__":
-    sys.exit(run_all_tests())
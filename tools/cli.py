@@ -1,16 +1,66 @@
+import atexit
 import os
 import sys
+from collections.abc import Callable
 
-from skills.ai_integration import AIOrchestrator
+try:
+    import readline  # gives input() line editing, history and tab completion
+except ImportError:  # not available on Windows
+    readline = None
+
+from config.settings import AVAILABLE_LABS, OPENROUTER_API_KEY
 from skills.lab_orchestrator import LabManager
 
+HISTORY_FILE = os.path.expanduser("~/.bagley_history")
+COMMAND_WORDS = ("start", "stop", "delete", "status", "list", "help", "quit", "exit")
+
+
+def _setup_readline() -> None:
+    """Tab-complete commands and lab types, and keep history across sessions"""
+    if readline is None:
+        return
+
+    words = sorted({*COMMAND_WORDS, *AVAILABLE_LABS})
+
+    def complete(text: str, state: int) -> str | None:
+        matches = [word for word in words if word.startswith(text)]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    readline.set_completer_delims(" \t\n")  # lab types like juice-shop contain '-'
+    if "libedit" in (readline.__doc__ or ""):  # macOS ships libedit in place of GNU readline
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+
+    readline.set_history_length(1000)
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass  # first run
+
+    def save_history() -> None:
+        try:
+            readline.write_history_file(HISTORY_FILE)
+        except OSError:
+            pass
+
+    atexit.register(save_history)
+
 
 class LabCLI:
     def __init__(self) -> None:
         self.manager = LabManager()
-        self.ai = AIOrchestrator()
+        # Created on first natural-language command; importing it pulls in requests and friends
+        self.ai = None
         self.username = os.getenv("USER") or os.getenv("USERNAME") or "user"
-        self.ai_enabled = bool(self.ai.api_key)
+        self.ai_enabled = bool(OPENROUTER_API_KEY)
+        # Commands that take no argument
+        self._dispatch: dict[str, Callable[[], None]] = {
+            "help": self.print_help,
+            "list": lambda: print(self.manager.list_available()),
+            "status": lambda: print(self.manager.get_status(self.username)),
+        }
 
     def print_banner(self) -> None:
         print("🧪 Bagley Lab Orchestrator")
@@ -40,7 +90,10 @@ class LabCLI:
 
     def _execute_action(self, action: str, lab_type: str | None) -> None:
         action = action.lower().strip()
-        if action == "start":
+        handler = self._dispatch.get(action)
+        if handler:
+            handler()
+        elif action == "start":
             if not lab_type:
                 print("❌ Please specify a lab type")
                 return
@@ -55,12 +108,6 @@ class LabCLI:
                 print("❌ Please specify a lab name or type")
                 return
             print(self.manager.delete_lab(self.username, lab_type))
-        elif action == "status":
-            print(self.manager.get_status(self.username))
-        elif action == "list":
-            print(self.manager.list_available())
-        elif action == "help":
-            self.print_help()
         else:
             print("❌ Unknown action")
 
@@ -77,16 +124,9 @@ class LabCLI:
             print("👋 Goodbye!")
             return False
 
-        if command == "help":
-            self.print_help()
-            return True
-
-        if command == "list":
-            print(self.manager.list_available())
-            return True
-
-        if command == "status":
-            print(self.manager.get_status(self.username))
+        handler = self._dispatch.get(command)
+        if handler:
+            handler()
             return True
 
         if command in {"start", "stop", "delete"}:
@@ -94,21 +134,23 @@ class LabCLI:
             return True
 
         if self.ai_enabled:
-            result = self.ai.parse_command(cleaned, self.username)
-            if not result.get("success"):
-                print(f"❌ {result.get('error')}")
+            if self.ai is None:
+                from skills.ai_integration import AIOrchestrator
+                self.ai = AIOrchestrator()
+
+            result = self.ai.parse_command(cleaned)
+            if not result.get("success") or not result.get("action"):
+                print(f"❌ {result.get('error', 'Could not understand that command')}")
                 return True
 
-            command = result["command"]
-            action = command.get("action")
-            lab_type = command.get("lab_type")
-            self._execute_action(action, lab_type)
+            self._execute_action(result["action"], result.get("lab_type"))
             return True
 
         print("❌ Unknown command. Type 'help' for options.")
         return True
 
     def run(self) -> None:
+        _setup_readline()
         self.print_banner()
         self.print_help()
         while True: